@@ -0,0 +1,294 @@
+"""
+Benchmarks for the scrape pipeline: fetch, normalize, serialize and upload
+Runs against mock_server.py with a synthetic corpus and writes JSON results
+so runs can be compared over time and regressions flagged
+
+Run: python benchmark.py
+     BENCH_SIZES=1000 BENCH_STAGES=normalize,writers python benchmark.py
+"""
+import csv
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from contract import normalize
+from http_session import ScraperSession
+from mock_server import MockContractsServer, SyntheticCorpus
+from page_decoder import available_backends, decode_page
+from page_fetcher import fetch_pages_concurrently
+from pipeline import ArrowSink, CsvSink, JsonArraySink, JsonLinesSink, pyarrow, run_pipeline
+from scrape_contracts_api import HEADERS
+from sheets import build_sheet_rows
+
+BENCH_SIZES = [int(s) for s in os.getenv('BENCH_SIZES', '1000,100000,1000000').split(',')]
+BENCH_STAGES = [s for s in os.getenv('BENCH_STAGES', '').split(',') if s]  # Empty = all
+BENCH_CONCURRENCY = [int(c) for c in os.getenv('BENCH_CONCURRENCY', '1,2,4,8').split(',')]
+BENCH_MAX_PAGES = int(os.getenv('BENCH_MAX_PAGES', '200'))  # Fetch stage page cap per level
+BENCH_LATENCY_MS = float(os.getenv('BENCH_LATENCY_MS', '50'))  # Simulated server latency for fetch
+BENCH_REPEAT = int(os.getenv('BENCH_REPEAT', '3'))  # Best of N (N=1 above 100k items)
+BENCH_OUTPUT = os.getenv('BENCH_OUTPUT', 'benchmark_results.json')
+BENCH_HISTORY = os.getenv('BENCH_HISTORY', 'benchmark_history.jsonl')
+BENCH_BASELINE = os.getenv('BENCH_BASELINE', '')  # Empty = previous BENCH_OUTPUT
+BENCH_TOLERANCE = float(os.getenv('BENCH_TOLERANCE', '0.2'))  # Allowed throughput drop
+
+QUANTITY = 120
+POOL_SIZE = 10000  # Distinct items; larger sizes cycle through the pool to bound memory
+
+
+def best_time(func, size):
+    """Best wall time of func() over BENCH_REPEAT runs"""
+    repeat = BENCH_REPEAT if size <= 100000 else 1
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def raw_items(size):
+    """size synthetic API items (cycled from a fixed pool)"""
+    corpus = SyntheticCorpus(min(size, POOL_SIZE))
+    pool = [corpus.item(i) for i in range(len(corpus))]
+    return [pool[i % len(pool)] for i in range(size)]
+
+
+def normalized_contracts(size):
+    pool = [normalize(item) for item in raw_items(min(size, POOL_SIZE))]
+    return [pool[i % len(pool)] for i in range(size)]
+
+
+def legacy_parse(item):
+    """The pre-Contract normalizer (nested dicts), kept as the records baseline"""
+    return {
+        'id': item.get('id', ''),
+        'link': item.get('url', ''),
+        'company1': item.get('company1', {}).get('name', ''),
+        'company2': item.get('company2', {}).get('name', ''),
+        'subjects': item.get('subject', ''),
+        'date': item.get('date', ''),
+        'country': item.get('market', [''])[0].upper() if item.get('market') else '',
+        'markets': ', '.join(item.get('market', [])),
+        'contract_slug': item.get('url', '').split('/')[-2] if item.get('url') else '',
+        'flags': {
+            'retail': item.get('flags', {}).get('retail', False),
+            'acquisition': item.get('flags', {}).get('acquisition', False),
+            'startup': item.get('flags', {}).get('startup', False),
+            'rebranding': item.get('flags', {}).get('rebranding', False)
+        }
+    }
+
+
+def bench_fetch(size):
+    """pages/sec through the concurrent fetch loop at each concurrency level"""
+    server = MockContractsServer(SyntheticCorpus(size), port=0, latency_ms=BENCH_LATENCY_MS)
+    url = server.start()
+    pages = min(math.ceil(size / QUANTITY), BENCH_MAX_PAGES)
+    results = {}
+    try:
+        for workers in BENCH_CONCURRENCY:
+            session = ScraperSession(headers=HEADERS)
+            fetch = lambda page: session.post(url, json={'paged': page, 'quantity': QUANTITY}).json()
+            items = 0
+            start = time.perf_counter()
+            for _, data in fetch_pages_concurrently(fetch, range(1, pages + 1), workers, requests_per_second=0):
+                items += len(data['items']) if data else 0
+            elapsed = time.perf_counter() - start
+            session.close()
+            results[f"fetch_c{workers}"] = {
+                'pages': pages,
+                'seconds': elapsed,
+                'pages_per_sec': pages / elapsed,
+                'items_per_sec': items / elapsed
+            }
+    finally:
+        server.stop()
+    return results
+
+
+def bench_normalize(size):
+    """items/sec through the per-item normalization loop"""
+    items = raw_items(size)
+    elapsed = best_time(lambda: [normalize(item) for item in items], size)
+    return {'normalize': {'seconds': elapsed, 'items_per_sec': size / elapsed}}
+
+
+def bench_records(size):
+    """Per-item cost and retained bytes per record: Contract vs the old nested dicts"""
+    items = raw_items(size)
+    results = {}
+    for name, parse in (('records_dict', legacy_parse), ('records_contract', normalize)):
+        elapsed = best_time(lambda: [parse(item) for item in items], size)
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [parse(item) for item in items]
+        retained = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        del kept
+        results[name] = {
+            'seconds': elapsed,
+            'items_per_sec': size / elapsed,
+            'us_per_item': elapsed / size * 1e6,
+            'bytes_per_record': retained / size
+        }
+    return results
+
+
+def bench_decode(size):
+    """Decode + normalize time per response page for each available JSON decoder"""
+    items = raw_items(size)
+    bodies = [json.dumps({'items': items[i:i + QUANTITY], 'pagination': {'total_pages': 1}}).encode('utf-8')
+              for i in range(0, size, QUANTITY)]
+    results = {}
+    for backend in available_backends():
+        decode = lambda: [[normalize(item) for item in decode_page(body, backend)['items']] for body in bodies]
+        elapsed = best_time(decode, size)
+        results[f"decode_{backend}"] = {
+            'seconds': elapsed,
+            'pages_per_sec': len(bodies) / elapsed,
+            'items_per_sec': size / elapsed,
+            'us_per_page': elapsed / len(bodies) * 1e6
+        }
+    return results
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def load_csv(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def load_parquet(path):
+    return pyarrow.parquet.read_table(path)
+
+
+def load_arrow(path):
+    with pyarrow.memory_map(path) as source:
+        return pyarrow.ipc.open_file(source).read_all()
+
+
+def bench_writers(size):
+    """Write throughput, file size and load time of each export, fed page by page
+
+    The columnar (parquet / arrow) exports are included when pyarrow is
+    installed; loading them yields typed tables, the rest plain dicts.
+    """
+    contracts = normalized_contracts(size)
+    pages = [contracts[i:i + QUANTITY] for i in range(0, size, QUANTITY)]
+    formats = [('json', JsonArraySink, load_json), ('jsonl', JsonLinesSink, load_jsonl), ('csv', CsvSink, load_csv)]
+    if pyarrow is not None:
+        formats += [('parquet', ArrowSink, load_parquet), ('arrow', ArrowSink, load_arrow)]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, sink, load in formats:
+            path = os.path.join(tmp, f"contracts.{name}")
+            elapsed = best_time(lambda: run_pipeline(pages, [sink(path)]), size)
+            load_elapsed = best_time(lambda: load(path), size)
+            mb = os.path.getsize(path) / (1024 * 1024)
+            results[f"write_{name}"] = {
+                'seconds': elapsed,
+                'items_per_sec': size / elapsed,
+                'mb': mb,
+                'mb_per_sec': mb / elapsed,
+                'load_ms': load_elapsed * 1000,
+                'load_items_per_sec': size / load_elapsed
+            }
+    return results
+
+
+def bench_sheet_rows(size):
+    """Row-building time for the Google Sheets upload"""
+    contracts = normalized_contracts(size)
+    elapsed = best_time(lambda: build_sheet_rows(contracts), size)
+    return {'sheet_rows': {'seconds': elapsed, 'items_per_sec': size / elapsed}}
+
+
+# stage name -> benchmark(size) returning {metric_group: {metric: value}}
+BENCHMARKS = {
+    'fetch': bench_fetch,
+    'normalize': bench_normalize,
+    'records': bench_records,
+    'decode': bench_decode,
+    'writers': bench_writers,
+    'sheet_rows': bench_sheet_rows,
+}
+
+
+def find_regressions(results, baseline):
+    """Throughput metrics that dropped more than BENCH_TOLERANCE vs the baseline"""
+    regressions = []
+    for key, metrics in results.items():
+        old = baseline.get(key, {})
+        for metric, value in metrics.items():
+            if not metric.endswith('_per_sec') or not old.get(metric):
+                continue
+            change = value / old[metric] - 1
+            if change < -BENCH_TOLERANCE:
+                regressions.append((key, metric, old[metric], value, change))
+    return regressions
+
+
+def main():
+    print("=" * 60)
+    print("  E-PLAY SCRAPER BENCHMARKS")
+    print("=" * 60)
+
+    baseline_file = BENCH_BASELINE or BENCH_OUTPUT
+    baseline = {}
+    if os.path.exists(baseline_file):
+        with open(baseline_file, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+
+    results = {}
+    stages = BENCH_STAGES or list(BENCHMARKS)
+    for size in BENCH_SIZES:
+        for stage in stages:
+            print(f"\n[{stage}] {size} contracts...")
+            for group, metrics in BENCHMARKS[stage](size).items():
+                key = f"{group}/{size}"
+                results[key] = metrics
+                summary = ', '.join(f"{m}={v:,.1f}" for m, v in metrics.items() if m != 'seconds')
+                print(f"  {key}: {summary} ({metrics['seconds']:.3f}s)")
+
+    run = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sizes': BENCH_SIZES,
+        'results': results
+    }
+    with open(BENCH_OUTPUT, 'w', encoding='utf-8') as f:
+        json.dump(run, f, indent=2)
+    with open(BENCH_HISTORY, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(run) + '\n')
+    print(f"\nSaved to {BENCH_OUTPUT} (history: {BENCH_HISTORY})")
+
+    regressions = find_regressions(results, baseline)
+    if regressions:
+        print(f"\n✗ {len(regressions)} regressions vs {baseline_file} (tolerance {BENCH_TOLERANCE:.0%}):")
+        for key, metric, old, new, change in regressions:
+            print(f"  {key} {metric}: {old:,.1f} -> {new:,.1f} ({change:+.0%})")
+        return 1
+    if baseline:
+        print(f"\n✓ No regressions vs {baseline_file}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
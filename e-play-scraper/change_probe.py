@@ -0,0 +1,69 @@
+"""
+Cheap change probe
+Page 1 of the listing tells whether a run has anything to do: if the newest
+contract (id and date) and total_pages match the last run, nothing is
+paginated, exported or uploaded
+"""
+import json
+import os
+
+from checkpoint import CHECKPOINT, CHECKPOINT_FILE
+from contract import normalize
+from contract_store import STORE_FILE
+
+CHANGE_PROBE = os.getenv('CHANGE_PROBE', 'true').lower() == 'true'  # false: always run in full
+PROBE_FILE = os.getenv('PROBE_FILE', 'change_probe.json')
+
+
+def signature(data):
+    """Newest id/date and page count of a decoded page 1, or None if it has no items"""
+    items = (data or {}).get('items') or []
+    if not items:
+        return None
+    newest = normalize(items[0])
+    return {
+        'newest_id': str(newest.id),
+        'newest_date': newest.date,
+        'total_pages': data.get('pagination', {}).get('total_pages', 1)
+    }
+
+
+class ChangeProbe:
+    """Compares page 1 with the signature saved by the last completed run
+
+    A run that left a checkpoint behind never counts as unchanged, so the
+    pages it missed are fetched even if page 1 looks the same.
+
+    Only catches what page 1 can show - new contracts and a changed page
+    count. Edits to older contracts wait for the next run that has something
+    new (or set CHANGE_PROBE=false to force a full pass).
+    """
+
+    def __init__(self, path=PROBE_FILE):
+        self.path = path
+        self.last = None
+        self.current = None
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.last = json.load(f)
+            except ValueError:
+                pass
+
+    def unchanged(self, first_page):
+        """True if the listing looks exactly as it did after the last run"""
+        self.current = signature(first_page)
+        if CHECKPOINT and os.path.exists(CHECKPOINT_FILE):
+            print("Interrupted scrape to resume - not skipping")
+            return False
+        if self.current is None or self.current != self.last or not os.path.exists(STORE_FILE):
+            return False
+        print(f"✓ No change since last run (newest contract {self.current['newest_id']} "
+              f"from {self.current['newest_date']}, {self.current['total_pages']} pages) - skipping scrape")
+        return True
+
+    def save(self):
+        """Record page 1 as seen by this run - only call it once the run stored and exported everything"""
+        if self.current is not None:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.current, f)
@@ -0,0 +1,59 @@
+"""
+Run-to-run change feed
+The contract store reports every contract a run adds, removes or modifies
+(with a field-level diff); each change is appended to an NDJSON changelog
+so consumers can follow changes instead of re-reading the full snapshot
+"""
+import json
+import os
+from datetime import datetime, timezone
+
+from contract import Contract
+
+CHANGELOG_FILE = os.getenv('CHANGELOG_FILE', 'contracts_changes.ndjson')  # Empty = no changelog
+
+
+def field_diff(old, new):
+    """{field: [old, new]} for every field that differs between two contracts"""
+    return {name: [getattr(old, name), getattr(new, name)]
+            for name in Contract.__slots__ if getattr(old, name) != getattr(new, name)}
+
+
+class Changelog:
+    """Appends one JSON line per change, stamped with the run's start time
+
+    {"run": ..., "change": "added" | "removed", "id": ..., "contract": {...}}
+    {"run": ..., "change": "modified", "id": ..., "fields": {"subjects": [old, new]}}
+    """
+
+    def __init__(self, path=CHANGELOG_FILE):
+        self.path = path
+        self.run = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.counts = {'added': 0, 'removed': 0, 'modified': 0}
+        self.lines = []
+
+    def record(self, change, id, **fields):
+        self.counts[change] += 1
+        self.lines.append(json.dumps(dict(run=self.run, change=change, id=id, **fields), ensure_ascii=False))
+
+    def added(self, contract):
+        self.record('added', contract.id, contract=contract.to_dict())
+
+    def removed(self, contract):
+        self.record('removed', contract.id, contract=contract.to_dict())
+
+    def modified(self, old, new):
+        self.record('modified', new.id, fields=field_diff(old, new))
+
+    def flush(self):
+        """Append the changes recorded so far (called once per stored page)"""
+        if self.lines:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(self.lines) + '\n')
+            self.lines = []
+
+    def close(self):
+        self.flush()
+        counts = self.counts
+        print(f"Changes this run: {counts['added']} added, {counts['removed']} removed, "
+              f"{counts['modified']} modified" + (f" (appended to {self.path})" if any(counts.values()) else ""))
@@ -0,0 +1,65 @@
+"""
+Checkpoint store for resumable scrapes
+Each completed page's contracts are journaled to SQLite as the run goes, so a
+crashed or killed run picks up where it stopped instead of starting over
+"""
+import json
+import os
+import sqlite3
+
+from contract import Contract
+
+CHECKPOINT = os.getenv('CHECKPOINT', 'true').lower() == 'true'
+CHECKPOINT_FILE = os.getenv('CHECKPOINT_FILE', 'scrape_checkpoint.db')
+
+
+class Checkpoint:
+    """SQLite journal of completed pages for one full scrape"""
+
+    def __init__(self, path=CHECKPOINT_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS run (total_pages INTEGER, newest_id TEXT)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS pages (page INTEGER PRIMARY KEY, contracts TEXT)')
+
+    def resume(self, total_pages, newest_id):
+        """Return the set of pages left done by an interrupted run
+
+        The checkpoint only matches the current listing if total_pages and the
+        newest contract id are unchanged - otherwise pages have shifted, so it
+        is thrown away and a fresh one is started.
+        """
+        row = self.conn.execute('SELECT total_pages, newest_id FROM run').fetchone()
+        if row == (total_pages, str(newest_id)):
+            done = {page for (page,) in self.conn.execute('SELECT page FROM pages')}
+            if done:
+                print(f"Resuming from checkpoint: {len(done)}/{total_pages} pages already done")
+            return done
+
+        if row:
+            print(f"Checkpoint is stale (was {row[0]} pages, newest id {row[1]}) - starting over")
+        with self.conn:
+            self.conn.execute('DELETE FROM run')
+            self.conn.execute('DELETE FROM pages')
+            self.conn.execute('INSERT INTO run VALUES (?, ?)', (total_pages, str(newest_id)))
+        return set()
+
+    def load_page(self, page):
+        """Contracts journaled for one done page (loaded on demand, not all at once)"""
+        row = self.conn.execute('SELECT contracts FROM pages WHERE page = ?', (page,)).fetchone()
+        return [Contract.from_dict(c) for c in json.loads(row[0])]
+
+    def save_page(self, page, contracts):
+        """Record one completed page"""
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO pages VALUES (?, ?)',
+                (page, json.dumps([c.to_dict() for c in contracts], ensure_ascii=False))
+            )
+
+    def clear(self):
+        """Drop the checkpoint once the run is complete"""
+        self.conn.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
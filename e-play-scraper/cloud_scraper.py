@@ -2,11 +2,16 @@
 Cloud-ready version of the scraper
 Uses environment variables for configuration
 """
-from curl_cffi import requests
-import json
 import os
-import time
-import random
+
+import response_cache
+from change_probe import CHANGE_PROBE
+from http_session import ScraperSession
+from incremental import INCREMENTAL
+from page_decoder import decode_page
+from page_fetcher import fetch_cached, limiter, page_payload
+from pipeline import run_scraper
+from retry_policy import CircuitOpen, RetryPolicy
 
 # Configuration from environment variables
 COOKIES = {
@@ -26,8 +31,7 @@ HEADERS = {
     'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36'
 }
 
-API_URL = 'https://e-play.pl/wp-json/contracts/v1/filter'
-DELAY_BETWEEN_PAGES = (0.5, 1)
+API_URL = os.getenv('API_URL', 'https://e-play.pl/wp-json/contracts/v1/filter')  # Point at mock_server.py for offline runs
 
 # Google Sheets config
 UPLOAD_TO_SHEETS = os.getenv('UPLOAD_TO_SHEETS', 'false').lower() == 'true'
@@ -35,208 +39,61 @@ SHEETS_CREDENTIALS_JSON = os.getenv('SHEETS_CREDENTIALS_JSON', '')  # Base64 or
 SHEETS_SPREADSHEET_NAME = os.getenv('SHEETS_SPREADSHEET_NAME', 'E-Play Contracts')
 SHEETS_WORKSHEET_NAME = os.getenv('SHEETS_WORKSHEET_NAME', 'Contracts')
 
+# One pooled session for every request (keeps connections alive between pages and runs)
+session = ScraperSession(headers=HEADERS, cookies=COOKIES)
 
-def fetch_contracts_page(page=1, quantity=120):
-    """Fetch one page of contracts from API"""
-    payload = {
-        'paged': page,
-        'quantity': quantity,
-        'subject': '',
-        'retail': '',
-        'acquisition': '',
-        'startup': '',
-        'rebranding': '',
-        'payments': '',
-        'date_from': '',
-        'date_to': ''
-    }
-    
-    try:
-        response = requests.post(
-            API_URL,
-            json=payload,
-            headers=HEADERS,
-            cookies=COOKIES,
-            timeout=30,
-            impersonate="chrome"
-        )
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"Error fetching page {page}: {e}")
-        return None
+# Retries and circuit breaker for page requests
+policy = RetryPolicy(limiter=limiter)
 
 
-def scrape_all_contracts():
-    """Scrape all contracts with pagination"""
-    all_contracts = []
-    page = 1
-    quantity = 120
-    total_pages = None
-    
-    while True:
-        data = fetch_contracts_page(page, quantity)
-        
-        if not data:
-            break
-        
-        items = data.get('items', [])
-        pagination = data.get('pagination', {})
-        
-        if total_pages is None:
-            total_pages = pagination.get('total_pages', 1)
-            print(f"Total pages: {total_pages}")
-        
-        if not items:
-            break
-        
-        for item in items:
-            contract = {
-                'id': item.get('id', ''),
-                'link': item.get('url', ''),
-                'company1': item.get('company1', {}).get('name', ''),
-                'company2': item.get('company2', {}).get('name', ''),
-                'subjects': item.get('subject', ''),
-                'date': item.get('date', ''),
-                'country': item.get('market', [''])[0].upper() if item.get('market') else '',
-                'markets': ', '.join(item.get('market', [])),
-                'contract_slug': item.get('url', '').split('/')[-2] if item.get('url') else '',
-                'flags': {
-                    'retail': item.get('flags', {}).get('retail', False),
-                    'acquisition': item.get('flags', {}).get('acquisition', False),
-                    'startup': item.get('flags', {}).get('startup', False),
-                    'rebranding': item.get('flags', {}).get('rebranding', False)
-                }
-            }
-            all_contracts.append(contract)
-        
-        current_page = pagination.get('page', page)
-        response_total_pages = pagination.get('total_pages', total_pages or 1)
-        
-        if total_pages != response_total_pages:
-            total_pages = response_total_pages
-        
-        print(f"Page {current_page}/{total_pages}: {len(items)} contracts (total: {len(all_contracts)})")
-        
-        if current_page >= total_pages:
-            break
-        
-        if len(items) == 0:
-            break
-        
-        page += 1
-        delay = random.uniform(*DELAY_BETWEEN_PAGES)
-        time.sleep(delay)
-    
-    return all_contracts
+def fetch_contracts_page(page=1, quantity=120, filters=None):
+    """Fetch one page of contracts from API (or the response cache)"""
+    return fetch_cached(send_page, page_payload(page, quantity, filters))
 
 
-def upload_to_google_sheets(contracts):
-    """Upload contracts to Google Sheets"""
-    try:
-        import gspread
-        from google.oauth2.service_account import Credentials
-        import base64
-    except ImportError:
-        print("gspread not installed, skipping Google Sheets upload")
-        return False
+def send_page(payload):
+    """POST one filter request, with retries; the decoded response or None"""
+    page = payload['paged']
     
-    if not SHEETS_CREDENTIALS_JSON:
-        print("SHEETS_CREDENTIALS_JSON not set, skipping upload")
-        return False
+    def attempt():
+        response = session.post(API_URL, json=payload, timeout=30)
+        response.raise_for_status()
+        data = decode_page(response.content)
+        response_cache.put(payload, response.content)
+        return data
     
     try:
-        # Parse credentials (can be base64 or JSON string)
-        try:
-            # Try base64 decode first
-            creds_json = json.loads(base64.b64decode(SHEETS_CREDENTIALS_JSON).decode('utf-8'))
-        except:
-            # If not base64, try direct JSON
-            creds_json = json.loads(SHEETS_CREDENTIALS_JSON)
-        
-        SCOPE = [
-            'https://www.googleapis.com/auth/spreadsheets',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        
-        creds = Credentials.from_service_account_info(creds_json, scopes=SCOPE)
-        client = gspread.authorize(creds)
-        
-        # Open spreadsheet
-        try:
-            spreadsheet = client.open(SHEETS_SPREADSHEET_NAME)
-        except gspread.exceptions.SpreadsheetNotFound:
-            spreadsheet = client.create(SHEETS_SPREADSHEET_NAME)
-        
-        # Get worksheet
-        try:
-            worksheet = spreadsheet.worksheet(SHEETS_WORKSHEET_NAME)
-        except gspread.exceptions.WorksheetNotFound:
-            worksheet = spreadsheet.add_worksheet(title=SHEETS_WORKSHEET_NAME, rows=10000, cols=15)
-        
-        # Prepare data
-        headers = [
-            'ID', 'Link', 'Company 1', 'Company 2', 'Subjects', 
-            'Date', 'Country', 'Markets', 'Contract Slug',
-            'Retail', 'Acquisition', 'Startup', 'Rebranding'
-        ]
-        
-        rows = [headers]
-        for c in contracts:
-            rows.append([
-                c.get('id', ''),
-                c.get('link', ''),
-                c.get('company1', ''),
-                c.get('company2', ''),
-                c.get('subjects', ''),
-                c.get('date', ''),
-                c.get('country', ''),
-                c.get('markets', ''),
-                c.get('contract_slug', ''),
-                'Yes' if c.get('flags', {}).get('retail') else '',
-                'Yes' if c.get('flags', {}).get('acquisition') else '',
-                'Yes' if c.get('flags', {}).get('startup') else '',
-                'Yes' if c.get('flags', {}).get('rebranding') else ''
-            ])
-        
-        # Upload
-        worksheet.clear()
-        worksheet.update('A1', rows, value_input_option='RAW')
-        
-        # Format header
-        worksheet.format('A1:M1', {
-            'textFormat': {'bold': True},
-            'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9}
-        })
-        
-        print(f"✓ Uploaded to Google Sheets: {spreadsheet.url}")
-        return True
-        
+        return policy.call(attempt, f"page {page}")
+    except CircuitOpen:
+        raise
     except Exception as e:
-        print(f"✗ Google Sheets upload failed: {e}")
-        return False
+        print(f"Error fetching page {page}: {e}")
+        return None
+
 
+def main(incremental=INCREMENTAL, change_probe=CHANGE_PROBE):
+    """Main function for cloud execution
 
-def main():
-    """Main function for cloud execution"""
+    Returns the number of contracts exported, 0 if nothing was new or the
+    run didn't complete (watch mode retries a sync that returns 0).
+
+    incremental: only fetch until the first page of known contracts
+    change_probe: end early when page 1 shows nothing new since the last run
+    """
     print("Starting E-Play scraper...")
     
     # Validate cookies
     if not COOKIES.get('cf_clearance'):
         print("ERROR: CF_CLEARANCE environment variable not set!")
-        return
-    
-    contracts = scrape_all_contracts()
-    print(f"\nTotal contracts found: {len(contracts)}")
+        return 0
     
-    # Upload to Google Sheets (if enabled)
-    if UPLOAD_TO_SHEETS:
-        upload_to_google_sheets(contracts)
-    else:
-        print("Google Sheets upload disabled (set UPLOAD_TO_SHEETS=true to enable)")
+    sheets = dict(spreadsheet_name=SHEETS_SPREADSHEET_NAME, worksheet_name=SHEETS_WORKSHEET_NAME,
+                  credentials_json=SHEETS_CREDENTIALS_JSON) if UPLOAD_TO_SHEETS else None
+    total = run_scraper(fetch_contracts_page, session, policy, sheets,
+                        incremental=incremental, change_probe=change_probe)
     
     print("Done!")
-    return contracts
+    return total
 
 
 if __name__ == '__main__':
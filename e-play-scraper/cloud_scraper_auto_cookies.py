@@ -2,16 +2,21 @@
 Cloud-ready scraper with automatic cookie refresh
 Gets fresh cookies before scraping if needed
 """
-from curl_cffi import requests
-import json
 import os
-import time
-import random
 import subprocess
 import sys
 
-API_URL = 'https://e-play.pl/wp-json/contracts/v1/filter'
-DELAY_BETWEEN_PAGES = (0.5, 1)
+import response_cache
+from change_probe import CHANGE_PROBE
+from credential_cache import CredentialCache, read_env_cookies
+from http_session import ScraperSession
+from incremental import INCREMENTAL
+from page_decoder import decode_page
+from page_fetcher import fetch_cached, limiter, page_payload
+from pipeline import run_scraper
+from retry_policy import CircuitOpen, RetryPolicy
+
+API_URL = os.getenv('API_URL', 'https://e-play.pl/wp-json/contracts/v1/filter')  # Point at mock_server.py for offline runs
 
 # Google Sheets config
 UPLOAD_TO_SHEETS = os.getenv('UPLOAD_TO_SHEETS', 'false').lower() == 'true'
@@ -23,6 +28,9 @@ SHEETS_WORKSHEET_NAME = os.getenv('SHEETS_WORKSHEET_NAME', 'Contracts')
 AUTO_REFRESH_COOKIES = os.getenv('AUTO_REFRESH_COOKIES', 'true').lower() == 'true'
 COOKIE_REFRESH_SCRIPT = 'get_cookies_automated.py'
 
+# Cookies with when they were obtained and last worked, shared by every worker
+credentials = CredentialCache()
+
 
 def get_cookies_from_env():
     """Get cookies from environment variables"""
@@ -88,24 +96,10 @@ def refresh_cookies_automated():
         )
         
         if result.returncode == 0:
-            # Try to read from .env.cookies file
-            env_file = '.env.cookies'
-            if os.path.exists(env_file):
-                cookies = {}
-                with open(env_file, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#') and '=' in line:
-                            key, value = line.split('=', 1)
-                            cookies[key.strip()] = value.strip()
-                
-                if cookies.get('CF_CLEARANCE'):
-                    print("✓ Successfully refreshed cookies")
-                    return {
-                        'cf_clearance': cookies.get('CF_CLEARANCE', ''),
-                        '_ga': cookies.get('GA_COOKIE', ''),
-                        '_ga_ZH4G2KK1JY': cookies.get('GA_ZH4G2KK1JY', '')
-                    }
+            cookies, _ = read_env_cookies()
+            if cookies:
+                print("✓ Successfully refreshed cookies")
+                return cookies
         
         print("⚠️  Cookie refresh script didn't return valid cookies")
         return None
@@ -119,76 +113,83 @@ def refresh_cookies_automated():
 
 
 def get_cookies():
-    """Get cookies - try auto-refresh first, fallback to env vars"""
-    cookies = get_cookies_from_env()
+    """Get cookies - cached ones that worked recently, else the first of cached/env that
+    passes a check, else an automatic refresh - and send them with every request"""
+    cookies = credentials.fresh()
+    if cookies:
+        session.set_cookies(cookies)
+        return cookies
     
-    # Check if we have valid cookies
-    if not cookies.get('cf_clearance'):
+    candidates = [('cache', credentials.cookies), ('environment', get_cookies_from_env())]
+    tested = []
+    for source, cookies in candidates:
+        if not cookies or not cookies.get('cf_clearance') or cookies in tested:
+            continue
+        print(f"Testing cookies from {source}...")
+        if test_cookies(cookies):
+            session.set_cookies(cookies)
+            return cookies
+        print(f"⚠️  Cookies from {source} failed validation")
+        credentials.discard(cookies)
+        tested.append(cookies)
+    if not tested:
         print("⚠️  No CF_CLEARANCE in environment variables")
-        
-        if AUTO_REFRESH_COOKIES:
-            print("Attempting automatic cookie refresh...")
-            refreshed = refresh_cookies_automated()
-            if refreshed and refreshed.get('cf_clearance'):
-                # Test the refreshed cookies
-                print("Testing refreshed cookies...")
-                if test_cookies(refreshed):
-                    return refreshed
-                else:
-                    print("⚠️  Refreshed cookies failed validation")
-                    print("   Cloudflare may be blocking automated browsers")
-                    print("   Recommendation: Use manual cookies (set CF_CLEARANCE secret)")
-        
-        print("ERROR: No valid cookies available!")
-        print("   Please set CF_CLEARANCE secret in GitHub with a fresh cookie from your browser")
-        return None
     
-    # Test cookies by making a request
-    print("Testing cookies from environment...")
-    test_result = test_cookies(cookies)
+    if AUTO_REFRESH_COOKIES:
+        print("Attempting automatic cookie refresh...")
+        refreshed = renew_cookies(tested[-1] if tested else None)
+        if refreshed:
+            return refreshed
     
-    if not test_result:
-        print("⚠️  Environment cookies failed validation")
-        if AUTO_REFRESH_COOKIES:
-            print("Attempting automatic cookie refresh...")
-            refreshed = refresh_cookies_automated()
-            if refreshed and refreshed.get('cf_clearance'):
-                # Test the refreshed cookies
-                if test_cookies(refreshed):
-                    return refreshed
-                else:
-                    print("⚠️  Auto-refresh failed - Cloudflare may be blocking")
-                    print("   Please update CF_CLEARANCE secret with fresh cookie from browser")
-        else:
-            print("   Please update CF_CLEARANCE secret with fresh cookie from browser")
-        return None
+    print("ERROR: No valid cookies available!")
+    print("   Please set CF_CLEARANCE secret in GitHub with a fresh cookie from your browser")
+    return None
+
+
+def renew_cookies(stale):
+    """Replace cookies the site rejected - one refresh however many workers ask at once
+
+    The new cookies go into the session, so every later request sends them.
+    """
+    def refresh():
+        refreshed = refresh_cookies_automated()
+        if not (refreshed and refreshed.get('cf_clearance')):
+            return None
+        # refresh_cookies_automated() may already have validated them
+        if refreshed != credentials.cookies and not test_cookies(refreshed):
+            print("⚠️  Refreshed cookies failed validation")
+            print("   Cloudflare may be blocking automated browsers")
+            print("   Recommendation: Use manual cookies (set CF_CLEARANCE secret)")
+            return None
+        return refreshed
     
+    cookies = credentials.refresh(stale, refresh)
+    if cookies:
+        session.set_cookies(cookies)
     return cookies
 
 
 def test_cookies(cookies):
-    """Test if cookies work by making a test request"""
+    """Test if cookies work by fetching page 1
+
+    The cookies are sent with this request only; get_cookies() puts the
+    ones that pass into the session. The response is kept in probe_page,
+    so the change probe and the scrape reuse it instead of asking for page
+    1 again.
+    """
+    global probe_page
     try:
-        headers = {
-            'accept': '*/*',
-            'content-type': 'application/json',
-            'origin': 'https://e-play.pl',
-            'referer': 'https://e-play.pl/umowy/',
-            'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        payload = {'paged': 1, 'quantity': 1}
-        response = requests.post(
-            API_URL,
-            json=payload,
-            headers=headers,
-            cookies=cookies,
-            timeout=10,
-            impersonate="chrome"
-        )
+        payload = page_payload(1)
+        response = session.post(API_URL, json=payload, cookies=cookies, timeout=10)
         
         if response.status_code == 200:
             print("✓ Cookies are valid")
+            credentials.store(cookies)
+            try:
+                probe_page = decode_page(response.content)
+                response_cache.put(payload, response.content)
+            except ValueError:
+                probe_page = None
             return True
         else:
             print(f"⚠️  Cookies test returned status {response.status_code}")
@@ -211,254 +212,79 @@ HEADERS = {
     'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36'
 }
 
+# One pooled session shared by the cookie check, page fetches and refresh validation
+session = ScraperSession(headers=HEADERS)
 
-def fetch_contracts_page(page=1, quantity=120, cookies=None):
-    """Fetch one page of contracts from API"""
-    if not cookies:
-        cookies = get_cookies()
-        if not cookies:
-            return None
-    
-    payload = {
-        'paged': page,
-        'quantity': quantity,
-        'subject': '',
-        'retail': '',
-        'acquisition': '',
-        'startup': '',
-        'rebranding': '',
-        'payments': '',
-        'date_from': '',
-        'date_to': ''
-    }
-    
-    max_retries = 2
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(
-                API_URL,
-                json=payload,
-                headers=HEADERS,
-                cookies=cookies,
-                timeout=30,
-                impersonate="chrome"
-            )
-            
-            # Check status code
-            if response.status_code == 403:
-                print(f"Got 403 on page {page} (attempt {attempt + 1}/{max_retries})")
-                print("⚠️  Cloudflare is blocking the request")
-                print("   This usually means cookies are invalid or Cloudflare detected automation")
-                
-                if AUTO_REFRESH_COOKIES and attempt < max_retries - 1:
-                    print("Refreshing cookies and retrying...")
-                    refreshed = refresh_cookies_automated()
-                    if refreshed and refreshed.get('cf_clearance'):
-                        # Test the new cookies
-                        if test_cookies(refreshed):
-                            cookies = refreshed
-                            time.sleep(2)  # Wait a bit before retry
-                            continue
-                        else:
-                            print("⚠️  Refreshed cookies also failed validation")
-                            print("   Recommendation: Use manual cookies (set CF_CLEARANCE secret)")
-                else:
-                    print("403 error persists - cookies may not be valid for API")
-                    print("   Please update CF_CLEARANCE secret with fresh cookie from browser")
-                    print(f"   Response preview: {response.text[:200]}")
-                    return None
-            
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.exceptions.HTTPError as e:
-            if e.response and e.response.status_code == 403:
-                print(f"HTTP 403 error on page {page}: {e}")
-                if AUTO_REFRESH_COOKIES and attempt < max_retries - 1:
-                    print("Refreshing cookies and retrying...")
-                    refreshed = refresh_cookies_automated()
-                    if refreshed and refreshed.get('cf_clearance'):
-                        cookies = refreshed
-                        time.sleep(2)
-                        continue
-                return None
-            raise
-        except Exception as e:
-            print(f"Error fetching page {page}: {e}")
-            if attempt < max_retries - 1 and AUTO_REFRESH_COOKIES:
-                print("Retrying with fresh cookies...")
-                refreshed = refresh_cookies_automated()
-                if refreshed:
-                    cookies = refreshed
-                    time.sleep(2)
-                    continue
-            return None
-    
-    return None
+# Retries and circuit breaker for page requests
+policy = RetryPolicy(limiter=limiter)
 
 
-def scrape_all_contracts():
-    """Scrape all contracts with pagination"""
-    # Get cookies once at start
-    cookies = get_cookies()
-    if not cookies:
-        print("ERROR: Could not get cookies!")
-        return []
-    
-    all_contracts = []
-    page = 1
-    quantity = 120
-    total_pages = None
-    
-    while True:
-        data = fetch_contracts_page(page, quantity, cookies)
-        
-        if not data:
-            break
-        
-        items = data.get('items', [])
-        pagination = data.get('pagination', {})
-        
-        if total_pages is None:
-            total_pages = pagination.get('total_pages', 1)
-            print(f"Total pages: {total_pages}")
-        
-        if not items:
-            break
-        
-        for item in items:
-            contract = {
-                'id': item.get('id', ''),
-                'link': item.get('url', ''),
-                'company1': item.get('company1', {}).get('name', ''),
-                'company2': item.get('company2', {}).get('name', ''),
-                'subjects': item.get('subject', ''),
-                'date': item.get('date', ''),
-                'country': item.get('market', [''])[0].upper() if item.get('market') else '',
-                'markets': ', '.join(item.get('market', [])),
-                'contract_slug': item.get('url', '').split('/')[-2] if item.get('url') else '',
-                'flags': {
-                    'retail': item.get('flags', {}).get('retail', False),
-                    'acquisition': item.get('flags', {}).get('acquisition', False),
-                    'startup': item.get('flags', {}).get('startup', False),
-                    'rebranding': item.get('flags', {}).get('rebranding', False)
-                }
-            }
-            all_contracts.append(contract)
-        
-        current_page = pagination.get('page', page)
-        response_total_pages = pagination.get('total_pages', total_pages or 1)
-        
-        if total_pages != response_total_pages:
-            total_pages = response_total_pages
-        
-        print(f"Page {current_page}/{total_pages}: {len(items)} contracts (total: {len(all_contracts)})")
-        
-        if current_page >= total_pages:
-            break
-        
-        if len(items) == 0:
-            break
-        
-        page += 1
-        delay = random.uniform(*DELAY_BETWEEN_PAGES)
-        time.sleep(delay)
-    
-    return all_contracts
+# Page 1 as fetched by the last successful cookie check
+probe_page = None
 
 
-def upload_to_google_sheets(contracts):
-    """Upload contracts to Google Sheets"""
-    try:
-        import gspread
-        from google.oauth2.service_account import Credentials
-        import base64
-    except ImportError:
-        print("gspread not installed, skipping Google Sheets upload")
-        return False
+def fetch_contracts_page(page=1, quantity=120, filters=None):
+    """Fetch one page of contracts from API (or the response cache)"""
+    return fetch_cached(send_page, page_payload(page, quantity, filters))
+
+
+def send_page(payload):
+    """POST one filter request with the session's current cookies, with retries; the decoded response or None"""
+    page = payload['paged']
+    if not session.cookies and not get_cookies():
+        return None
     
-    if not SHEETS_CREDENTIALS_JSON:
-        print("SHEETS_CREDENTIALS_JSON not set, skipping upload")
-        return False
+    sent = None  # Cookies the latest attempt went out with
+    
+    def attempt():
+        # Read on every attempt - another worker may have refreshed them meanwhile
+        nonlocal sent
+        sent = session.cookies
+        response = session.post(API_URL, json=payload, timeout=30)
+        response.raise_for_status()
+        data = decode_page(response.content)
+        response_cache.put(payload, response.content)
+        credentials.used(sent)
+        return data
+    
+    def on_auth():
+        # Only a 403 means the cookies went stale - nothing else triggers a refresh
+        print(f"Got 403 on page {page} - Cloudflare is blocking the request")
+        credentials.discard(sent)
+        if not AUTO_REFRESH_COOKIES:
+            print("   Please update CF_CLEARANCE secret with fresh cookie from browser")
+            return False
+        return bool(renew_cookies(sent))
     
     try:
-        try:
-            creds_json = json.loads(base64.b64decode(SHEETS_CREDENTIALS_JSON).decode('utf-8'))
-        except:
-            creds_json = json.loads(SHEETS_CREDENTIALS_JSON)
-        
-        SCOPE = [
-            'https://www.googleapis.com/auth/spreadsheets',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        
-        creds = Credentials.from_service_account_info(creds_json, scopes=SCOPE)
-        client = gspread.authorize(creds)
-        
-        try:
-            spreadsheet = client.open(SHEETS_SPREADSHEET_NAME)
-        except gspread.exceptions.SpreadsheetNotFound:
-            spreadsheet = client.create(SHEETS_SPREADSHEET_NAME)
-        
-        try:
-            worksheet = spreadsheet.worksheet(SHEETS_WORKSHEET_NAME)
-        except gspread.exceptions.WorksheetNotFound:
-            worksheet = spreadsheet.add_worksheet(title=SHEETS_WORKSHEET_NAME, rows=10000, cols=15)
-        
-        headers = [
-            'ID', 'Link', 'Company 1', 'Company 2', 'Subjects', 
-            'Date', 'Country', 'Markets', 'Contract Slug',
-            'Retail', 'Acquisition', 'Startup', 'Rebranding'
-        ]
-        
-        rows = [headers]
-        for c in contracts:
-            rows.append([
-                c.get('id', ''),
-                c.get('link', ''),
-                c.get('company1', ''),
-                c.get('company2', ''),
-                c.get('subjects', ''),
-                c.get('date', ''),
-                c.get('country', ''),
-                c.get('markets', ''),
-                c.get('contract_slug', ''),
-                'Yes' if c.get('flags', {}).get('retail') else '',
-                'Yes' if c.get('flags', {}).get('acquisition') else '',
-                'Yes' if c.get('flags', {}).get('startup') else '',
-                'Yes' if c.get('flags', {}).get('rebranding') else ''
-            ])
-        
-        worksheet.clear()
-        worksheet.update('A1', rows, value_input_option='RAW')
-        
-        worksheet.format('A1:M1', {
-            'textFormat': {'bold': True},
-            'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9}
-        })
-        
-        print(f"✓ Uploaded to Google Sheets: {spreadsheet.url}")
-        return True
-        
+        return policy.call(attempt, f"page {page}", on_auth=on_auth)
+    except CircuitOpen:
+        raise
     except Exception as e:
-        print(f"✗ Google Sheets upload failed: {e}")
-        return False
+        print(f"Error fetching page {page}: {e}")
+        return None
 
 
-def main():
+def main(incremental=INCREMENTAL, change_probe=CHANGE_PROBE):
     """Main function for cloud execution"""
     print("Starting E-Play scraper with auto-cookie refresh...")
     
-    contracts = scrape_all_contracts()
-    print(f"\nTotal contracts found: {len(contracts)}")
+    # The cookie check fetches page 1, so the change probe and the scrape
+    # start from it instead of asking again
+    global probe_page
+    probe_page = None
+    if not get_cookies():
+        print("ERROR: Could not get cookies!")
+        return 0
     
-    if UPLOAD_TO_SHEETS:
-        upload_to_google_sheets(contracts)
-    else:
-        print("Google Sheets upload disabled (set UPLOAD_TO_SHEETS=true to enable)")
+    sheets = dict(spreadsheet_name=SHEETS_SPREADSHEET_NAME, worksheet_name=SHEETS_WORKSHEET_NAME,
+                  credentials_json=SHEETS_CREDENTIALS_JSON) if UPLOAD_TO_SHEETS else None
+    total = run_scraper(fetch_contracts_page, session, policy, sheets, first_page=probe_page,
+                        incremental=incremental, change_probe=change_probe)
+    credentials.flush()
     
     print("Done!")
-    return contracts
+    return total
 
 
 if __name__ == '__main__':
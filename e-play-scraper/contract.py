@@ -0,0 +1,139 @@
+"""
+Contract record and the one normalizer shared by every scraper
+Maps a raw filter API item to a compact __slots__ record; repeated strings
+(market codes, countries, dates, company names) are interned
+"""
+import sys
+
+# tuple(market codes) -> (country, markets), filled as new combinations show up
+_market_cache = {}
+
+
+class Contract:
+    """One contract, flat and without a per-instance __dict__"""
+
+    __slots__ = (
+        'id', 'link', 'company1', 'company2', 'subjects', 'date',
+        'country', 'markets', 'contract_slug',
+        'retail', 'acquisition', 'startup', 'rebranding'
+    )
+
+    def __init__(self, id='', link='', company1='', company2='', subjects='', date='',
+                 country='', markets='', contract_slug='',
+                 retail=False, acquisition=False, startup=False, rebranding=False):
+        self.id = id
+        self.link = link
+        self.company1 = company1
+        self.company2 = company2
+        self.subjects = subjects
+        self.date = date
+        self.country = country
+        self.markets = markets
+        self.contract_slug = contract_slug
+        self.retail = retail
+        self.acquisition = acquisition
+        self.startup = startup
+        self.rebranding = rebranding
+
+    @property
+    def flags(self):
+        return {'retail': self.retail, 'acquisition': self.acquisition,
+                'startup': self.startup, 'rebranding': self.rebranding}
+
+    def to_dict(self):
+        """The nested dict stored in contracts.json"""
+        return {
+            'id': self.id,
+            'link': self.link,
+            'company1': self.company1,
+            'company2': self.company2,
+            'subjects': self.subjects,
+            'date': self.date,
+            'country': self.country,
+            'markets': self.markets,
+            'contract_slug': self.contract_slug,
+            'flags': self.flags
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        """Inverse of to_dict (for contracts.json, checkpoints and the like)"""
+        flags = d.get('flags') or {}
+        return cls(
+            d.get('id', ''), d.get('link', ''),
+            _intern(d.get('company1', '')), _intern(d.get('company2', '')),
+            d.get('subjects', ''), _intern(d.get('date', '')),
+            _intern(d.get('country', '')), _intern(d.get('markets', '')),
+            d.get('contract_slug', ''),
+            flags.get('retail', False), flags.get('acquisition', False),
+            flags.get('startup', False), flags.get('rebranding', False)
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, Contract):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"Contract(id={self.id!r}, subjects={self.subjects!r}, date={self.date!r})"
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _company(value):
+    """Company name from a plain string or a {'name': ...} object"""
+    if isinstance(value, dict):
+        return value.get('name', '') or ''
+    return str(value) if value else ''
+
+
+def _markets(market):
+    """(country, markets) for a market code list, computed once per combination"""
+    key = tuple(market) if market else ()
+    cached = _market_cache.get(key)
+    if cached is None:
+        country = sys.intern(str(key[0]).upper()) if key else ''
+        cached = _market_cache[key] = (country, sys.intern(', '.join(key)))
+    return cached
+
+
+def build(id, url, company1, company2, subject, date, market,
+          retail=False, acquisition=False, startup=False, rebranding=False):
+    """Contract from fields already pulled out of an API item
+
+    Shared by normalize() and the typed decoder in page_decoder.py. subjects
+    is the API's own label, or built from the two names when it's missing.
+    """
+    url = url or ''
+    country, markets = _markets(market)
+    return Contract(
+        id, url,
+        _intern(company1), _intern(company2),
+        subject or (f"{company1} 🤝 {company2}" if company2 else company1),
+        _intern(date), country, markets,
+        url.split('/')[-2] if url else '',
+        retail, acquisition, startup, rebranding
+    )
+
+
+def normalize(item):
+    """Map one API item to a Contract
+
+    Company names come from subject1/subject2, falling back to the
+    company1/company2 objects. Items that were decoded straight into
+    records (see page_decoder.py) are passed through.
+    """
+    if item.__class__ is Contract:
+        return item
+    get = item.get
+    flags = get('flags') or {}
+    return build(
+        get('id', ''), get('url'),
+        get('subject1') or _company(get('company1')),
+        get('subject2') or _company(get('company2')),
+        get('subject'), get('date', ''), get('market'),
+        flags.get('retail', False), flags.get('acquisition', False),
+        flags.get('startup', False), flags.get('rebranding', False)
+    )
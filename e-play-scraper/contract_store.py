@@ -0,0 +1,263 @@
+"""
+SQLite contract store - the system of record
+Scraped pages are upserted one transaction per page; incremental runs, the
+file exports and the Sheets sync all read contracts back from here. Given a
+changelog, every add, removal and modification is reported to it
+"""
+import os
+import sqlite3
+from datetime import datetime
+
+from contract import Contract, _intern
+from incremental import contract_hash
+
+STORE_FILE = os.getenv('STORE_FILE', 'contracts.db')
+STORE_PAGE_SIZE = int(os.getenv('STORE_PAGE_SIZE', '1000'))  # Contracts per page when reading back
+LOOKUP_CHUNK = 500  # Keys per IN (...) lookup, well under SQLite's variable limit
+
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y', '%Y/%m/%d', '%d-%m-%Y')
+
+# Contract fields in Contract() argument order
+FIELDS = Contract.__slots__
+
+SCHEMA = [
+    # key is str(id) for lookups; id keeps the API's own type (no column affinity)
+    '''CREATE TABLE IF NOT EXISTS contracts (
+        key TEXT PRIMARY KEY,
+        id,
+        link TEXT,
+        company1 TEXT,
+        company2 TEXT,
+        subjects TEXT,
+        date TEXT,
+        country TEXT,
+        markets TEXT,
+        contract_slug TEXT,
+        retail INTEGER,
+        acquisition INTEGER,
+        startup INTEGER,
+        rebranding INTEGER,
+        parsed_date TEXT,
+        position INTEGER,
+        hash TEXT,
+        run INTEGER
+    )''',
+    'CREATE INDEX IF NOT EXISTS contracts_id ON contracts (id)',
+    'CREATE INDEX IF NOT EXISTS contracts_parsed_date ON contracts (parsed_date)',
+    'CREATE INDEX IF NOT EXISTS contracts_company1 ON contracts (company1)',
+    'CREATE INDEX IF NOT EXISTS contracts_company2 ON contracts (company2)',
+    'CREATE INDEX IF NOT EXISTS contracts_market ON contracts (country, markets)',
+    'CREATE INDEX IF NOT EXISTS contracts_flags ON contracts (retail, acquisition, startup, rebranding)',
+    'CREATE INDEX IF NOT EXISTS contracts_position ON contracts (position)',
+]
+
+# Full runs renumber positions from 0; a contract seen twice in one run keeps its first place
+UPSERT = f'''
+    INSERT INTO contracts (key, {', '.join(FIELDS)}, parsed_date, position, hash, run)
+    VALUES ({', '.join('?' * (len(FIELDS) + 5))})
+    ON CONFLICT (key) DO UPDATE SET
+        {', '.join(f'{name} = excluded.{name}' for name in FIELDS)},
+        parsed_date = excluded.parsed_date, hash = excluded.hash,
+        position = CASE WHEN contracts.run = excluded.run THEN contracts.position ELSE excluded.position END,
+        run = excluded.run
+'''
+
+# Incremental merges update content but leave existing rows where they are
+UPDATE = f'''
+    UPDATE contracts SET {', '.join(f'{name} = ?' for name in FIELDS)}, parsed_date = ?, hash = ?, run = ?
+    WHERE key = ?
+'''
+
+
+def parse_date(value):
+    """ISO date (YYYY-MM-DD) for the API's date string, or None if it can't be read"""
+    value = (value or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value[:10], fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _values(c):
+    return (c.id, c.link, c.company1, c.company2, c.subjects, c.date,
+            c.country, c.markets, c.contract_slug,
+            int(bool(c.retail)), int(bool(c.acquisition)), int(bool(c.startup)), int(bool(c.rebranding)))
+
+
+def _contract(row):
+    (id, link, company1, company2, subjects, date, country, markets, contract_slug,
+     retail, acquisition, startup, rebranding) = row
+    return Contract(
+        id, link, _intern(company1), _intern(company2), subjects, _intern(date),
+        _intern(country), _intern(markets), contract_slug,
+        bool(retail), bool(acquisition), bool(startup), bool(rebranding)
+    )
+
+
+class ContractStore:
+    """contracts table in a WAL-mode SQLite database, in listing order (newest first)"""
+
+    def __init__(self, path=STORE_FILE, changelog=None):
+        self.path = path
+        self.changelog = changelog
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')  # Durable per transaction under WAL, minus the fsync per commit
+        with self.conn:
+            for statement in SCHEMA:
+                self.conn.execute(statement)
+
+    def count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM contracts').fetchone()[0]
+
+    def hashes(self):
+        """id -> content hash for every stored contract (for SeenIndex)"""
+        return dict(self.conn.execute('SELECT key, hash FROM contracts'))
+
+    def new_run(self):
+        """Number for a new scrape run; rows it writes are stamped with it"""
+        return self.conn.execute('SELECT COALESCE(MAX(run), 0) + 1 FROM contracts').fetchone()[0]
+
+    def lookup(self, columns, keys):
+        """Rows (key, *columns) for the given keys"""
+        keys = list(keys)
+        for i in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[i:i + LOOKUP_CHUNK]
+            yield from self.conn.execute(
+                f'SELECT key, {columns} FROM contracts WHERE key IN ({", ".join("?" * len(chunk))})', chunk
+            )
+
+    def stored(self, keys):
+        """key -> stored Contract for the keys that are in the store"""
+        return {row[0]: _contract(row[1:]) for row in self.lookup(', '.join(FIELDS), keys)}
+
+    def record_changes(self, rows):
+        """Report the contracts in rows [(contract, key, hash)] that are new or differ from the store"""
+        hashes = dict(self.lookup('hash', {key for _, key, _ in rows}))
+        old = self.stored(key for _, key, digest in rows if hashes.get(key, digest) != digest)
+        for contract, key, digest in rows:
+            if key not in hashes:
+                self.changelog.added(contract)
+            elif hashes[key] != digest:
+                self.changelog.modified(old[key], contract)
+            # A repeat later in the page compares against this version
+            hashes[key] = digest
+            old[key] = contract
+
+    def upsert_page(self, contracts, run, position):
+        """Insert or update one page of a full run in a single transaction"""
+        rows = [(c, str(c.id), contract_hash(c)) for c in contracts]
+        if self.changelog is not None:
+            self.record_changes(rows)
+        with self.conn:
+            self.conn.executemany(UPSERT, [
+                (key,) + _values(c) + (parse_date(c.date), position + n, digest, run)
+                for n, (c, key, digest) in enumerate(rows)
+            ])
+        if self.changelog is not None:
+            self.changelog.flush()
+
+    def remove_stale(self, run):
+        """Drop contracts a complete run no longer listed; returns how many
+
+        Only call this once every page of the run was stored. The rows are
+        read and deleted in one transaction, and logged as removed only
+        after it commits, so the changelog never lists a row still stored.
+        """
+        with self.conn:
+            rows = (self.conn.execute(f'SELECT {", ".join(FIELDS)} FROM contracts WHERE run != ?', (run,)).fetchall()
+                    if self.changelog is not None else [])
+            removed = self.conn.execute('DELETE FROM contracts WHERE run != ?', (run,)).rowcount
+        if self.changelog is not None:
+            for row in rows:
+                self.changelog.removed(_contract(row))
+            self.changelog.flush()
+        return removed
+
+    def merge(self, contracts):
+        """Merge incrementally scraped contracts, returning (added, changed)
+
+        New ids go in front (pages come back newest first), changed ids are
+        updated in place. One transaction for the whole merge.
+        """
+        known = self.hashes()
+        run = self.new_run()
+        new, changed, seen = [], [], set()
+        for c in contracts:
+            key = str(c.id)
+            if key in seen:
+                continue
+            seen.add(key)
+            if key not in known:
+                new.append(c)
+            elif known[key] != contract_hash(c):
+                changed.append(c)
+
+        if self.changelog is not None:
+            old = self.stored(str(c.id) for c in changed)
+            for c in new:
+                self.changelog.added(c)
+            for c in changed:
+                self.changelog.modified(old[str(c.id)], c)
+
+        top = self.conn.execute('SELECT COALESCE(MIN(position), 0) FROM contracts').fetchone()[0]
+        with self.conn:
+            self.conn.executemany(UPSERT, [
+                (str(c.id),) + _values(c) + (parse_date(c.date), top - len(new) + n, contract_hash(c), run)
+                for n, c in enumerate(new)
+            ])
+            self.conn.executemany(UPDATE, [
+                _values(c) + (parse_date(c.date), contract_hash(c), run, str(c.id)) for c in changed
+            ])
+        if self.changelog is not None:
+            self.changelog.flush()
+        return len(new), len(changed)
+
+    def pages(self, size=STORE_PAGE_SIZE):
+        """Stored contracts in listing order, size at a time"""
+        cursor = self.conn.execute(f'SELECT {", ".join(FIELDS)} FROM contracts ORDER BY position, key')
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                return
+            yield [_contract(row) for row in rows]
+
+    def close(self):
+        self.conn.close()
+        if self.changelog is not None:
+            self.changelog.close()
+
+
+class StoreSink:
+    """Pipeline sink upserting each page of a full scrape into the store
+
+    On close, contracts the run didn't see are removed - unless it saw
+    nothing at all, which means the scrape failed rather than the site
+    emptying out. A scrape that missed pages ends in abort() instead, which
+    keeps every stored row.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.run = store.new_run()
+        self.count = 0
+        self.closed = False  # Set once a complete scrape has been stored and cleaned up
+        self.aborted = False
+
+    def write(self, contracts):
+        self.store.upsert_page(contracts, self.run, self.count)
+        self.count += len(contracts)
+
+    def close(self):
+        if self.aborted:
+            return  # Part of the run is missing - nothing may be removed
+        removed = self.store.remove_stale(self.run) if self.count else 0
+        print(f"✓ Stored {self.count} contracts in {self.store.path}"
+              + (f" ({removed} no longer listed, removed)" if removed else ""))
+        self.closed = True
+
+    def abort(self):
+        self.aborted = True
+        print(f"⚠️  Scrape stopped - {self.count} contracts stored, nothing removed")
@@ -0,0 +1,130 @@
+"""
+Persistent Cloudflare cookie cache
+Cookies are kept with the time they were obtained and last worked, so a run
+can skip the validation request while they're recent, and a refresh is done
+once for all fetch workers that hit an auth failure at the same time
+"""
+import json
+import os
+import threading
+import time
+
+COOKIE_CACHE_FILE = os.getenv('COOKIE_CACHE_FILE', 'cookie_cache.json')
+COOKIE_TRUST_SECONDS = float(os.getenv('COOKIE_TRUST_SECONDS', '900'))  # Skip validation if they worked this recently
+COOKIE_MAX_AGE = float(os.getenv('COOKIE_MAX_AGE', '86400'))  # Always re-validate cookies obtained longer ago
+SAVE_INTERVAL = 60  # Seconds between writes that only move last_ok forward
+REFRESH_RETRY_AFTER = 60  # Seconds a failed refresh is shared before another may be tried
+
+# .env.cookies names -> cookie names
+ENV_COOKIE_NAMES = {'CF_CLEARANCE': 'cf_clearance', 'GA_COOKIE': '_ga', 'GA_ZH4G2KK1JY': '_ga_ZH4G2KK1JY'}
+
+
+def read_env_cookies(path='.env.cookies'):
+    """(cookies, mtime) from a KEY=value file written by the get_cookies_* scripts, or (None, None)"""
+    if not os.path.exists(path):
+        return None, None
+    values = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            key, sep, value = line.strip().partition('=')
+            if sep and not key.startswith('#'):
+                values[key.strip()] = value.strip().strip('"\'')
+    cookies = {name: values.get(key, '') for key, name in ENV_COOKIE_NAMES.items()}
+    return (cookies, os.path.getmtime(path)) if cookies['cf_clearance'] else (None, None)
+
+
+class CredentialCache:
+    """Cookies plus when they were obtained (acquired) and last worked (last_ok), in a JSON file
+
+    Only cookies that passed a request are stored, and rejected ones are
+    discarded, so the cached cookies are always the last ones that worked.
+    """
+
+    def __init__(self, path=COOKIE_CACHE_FILE, trust_seconds=COOKIE_TRUST_SECONDS, max_age=COOKIE_MAX_AGE):
+        self.path = path
+        self.trust_seconds = trust_seconds
+        self.max_age = max_age
+        self.cookies = None
+        self.acquired = self.last_ok = self.saved_at = 0
+        self.failed_for = None  # Cookies whose refresh just failed, and when
+        self.failed_at = 0
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                self.cookies = entry['cookies']
+                self.acquired = entry['acquired']
+                self.last_ok = self.saved_at = entry['last_ok']
+            except (ValueError, KeyError, TypeError):
+                pass
+
+    def fresh(self):
+        """Cached cookies if they worked recently enough to use without a check, else None"""
+        now = time.time()
+        with self.lock:
+            if (self.cookies and now - self.last_ok < self.trust_seconds
+                    and now - self.acquired < self.max_age):
+                print(f"✓ Using cached cookies (worked {now - self.last_ok:.0f}s ago) - skipping validation")
+                return self.cookies
+        return None
+
+    def store(self, cookies, acquired=None):
+        """Record cookies that just passed a request; keeps the acquired time of known cookies"""
+        now = time.time()
+        with self.lock:
+            changed = cookies != self.cookies
+            if changed:
+                self.cookies = dict(cookies)
+                self.acquired = acquired or now
+            self.last_ok = now
+            if changed or now - self.saved_at >= SAVE_INTERVAL:
+                self._save()
+
+    def used(self, cookies):
+        """A page request with these cookies succeeded"""
+        if cookies == self.cookies:
+            self.store(cookies)
+
+    def discard(self, cookies):
+        """Forget cookies that were just rejected, so the cache only holds ones that last worked"""
+        with self.lock:
+            if cookies == self.cookies:
+                self.cookies = None
+                self._save()
+
+    def refresh(self, stale, refresher):
+        """Single-flight refresh after stale cookies were rejected
+
+        The first worker runs refresher() (returning validated cookies or
+        None); workers arriving meanwhile wait and share its result instead
+        of starting refreshes of their own.
+        """
+        with self.refresh_lock:
+            if self.cookies and self.cookies != stale:
+                return self.cookies  # Another worker already replaced them
+            if self.failed_for == stale and time.time() - self.failed_at < REFRESH_RETRY_AFTER:
+                return None
+            cookies = refresher()
+            if cookies:
+                self.store(cookies)
+                self.failed_for = None
+            else:
+                self.failed_for, self.failed_at = stale, time.time()
+            return cookies
+
+    def flush(self):
+        """Write out a last_ok that only moved in memory (call at the end of a run)"""
+        with self.lock:
+            if self.cookies and self.last_ok > self.saved_at:
+                self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'cookies': self.cookies, 'acquired': self.acquired, 'last_ok': self.last_ok}, f)
+        os.replace(tmp, self.path)
+        self.saved_at = self.last_ok
@@ -0,0 +1,166 @@
+"""
+Date-sharded parallel backfill
+Splits the history into date_from/date_to windows small enough to fit in a
+few pages, fetches the windows in parallel and dedupes by id at merge time
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from page_fetcher import MAX_CONCURRENT_PAGES, IncompleteScrape
+from retry_policy import CircuitOpen
+
+BACKFILL = os.getenv('BACKFILL', 'false').lower() == 'true'
+BACKFILL_START = os.getenv('BACKFILL_START', '2010-01-01')  # Oldest date to backfill from
+BACKFILL_END = os.getenv('BACKFILL_END', '')  # Empty = today
+SHARD_PAGES = int(os.getenv('SHARD_PAGES', '3'))  # Target pages per window
+SHARD_RETRIES = int(os.getenv('SHARD_RETRIES', '2'))  # Retries per failed window
+SHARD_DATE_FORMAT = os.getenv('SHARD_DATE_FORMAT', '%Y-%m-%d')  # Format the API expects
+
+
+def date_filters(start, end):
+    """Filter fields for one date window"""
+    return {
+        'date_from': start.strftime(SHARD_DATE_FORMAT),
+        'date_to': end.strftime(SHARD_DATE_FORMAT)
+    }
+
+
+def plan_shards(count_contracts, start, end, max_contracts, workers=None):
+    """Split [start, end] into windows holding at most max_contracts each
+
+    count_contracts(start, end) returns the number of contracts in a window,
+    or None if the probe failed (the window is then kept as is).
+    Windows are probed level by level in parallel and halved until they fit.
+    Returns [(start, end, count)] newest first.
+    """
+    shards = []
+    pending = [(start, end)]
+
+    with ThreadPoolExecutor(max_workers=workers or MAX_CONCURRENT_PAGES) as executor:
+        while pending:
+            counts = list(executor.map(lambda w: count_contracts(*w), pending))
+            next_level = []
+            for (lo, hi), count in zip(pending, counts):
+                if count == 0:
+                    continue
+                if count is None or count <= max_contracts or lo == hi:
+                    shards.append((lo, hi, count))
+                    continue
+                mid = lo + (hi - lo) // 2
+                next_level.append((lo, mid))
+                next_level.append((mid + timedelta(days=1), hi))
+            pending = next_level
+
+    shards.sort(key=lambda s: s[0], reverse=True)
+    return shards
+
+
+def fetch_shard(fetch_page, shard, quantity):
+    """Walk all pages of one date window, returning its items (None on failure)"""
+    start, end, _ = shard
+    filters = date_filters(start, end)
+    items = []
+    page = 1
+
+    while True:
+        try:
+            data = fetch_page(page, quantity, filters)
+        except CircuitOpen:
+            raise
+        except Exception as e:
+            print(f"Error fetching {filters['date_from']} .. {filters['date_to']} page {page}: {e}")
+            return None
+        if not data:
+            return None
+
+        batch = data.get('items', [])
+        items.extend(batch)
+        total_pages = data.get('pagination', {}).get('total_pages', 1)
+        if not batch or page >= total_pages:
+            return items
+        page += 1
+
+
+def backfill(fetch_page, parse, start=None, end=None, quantity=120, workers=None):
+    """Fetch the whole history as parallel date windows
+
+    fetch_page is called as fetch_page(page, quantity, filters) and returns
+    the parsed JSON response or None (rate limited by fetch_cached). parse maps an API item to a contract.
+    Returns contracts newest first, deduplicated by id. If windows still
+    fail after SHARD_RETRIES, raises IncompleteScrape carrying the rest.
+    """
+    start = start or date.fromisoformat(BACKFILL_START)
+    end = end or (date.fromisoformat(BACKFILL_END) if BACKFILL_END else date.today())
+    workers = workers or MAX_CONCURRENT_PAGES
+    def count_contracts(lo, hi):
+        # With quantity=1, total_pages is the number of contracts in the window
+        try:
+            data = fetch_page(1, 1, date_filters(lo, hi))
+        except CircuitOpen:
+            raise
+        except Exception as e:
+            print(f"Error probing {lo} .. {hi}: {e}")
+            return None
+        if not data:
+            return None
+        if not data.get('items'):
+            return 0
+        return data.get('pagination', {}).get('total_pages', 1)
+
+    print(f"Planning date shards {start} .. {end} (max {SHARD_PAGES} pages each)...")
+    shards = plan_shards(count_contracts, start, end, SHARD_PAGES * quantity, workers)
+    print(f"Planned {len(shards)} date windows")
+
+    results = {}
+    pending = list(shards)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for attempt in range(SHARD_RETRIES + 1):
+            if not pending:
+                break
+            if attempt:
+                print(f"Retrying {len(pending)} failed windows (attempt {attempt}/{SHARD_RETRIES})...")
+            fetched = executor.map(lambda s: fetch_shard(fetch_page, s, quantity), pending)
+            failed = []
+            for shard, items in zip(pending, fetched):
+                if items is None:
+                    failed.append(shard)
+                    continue
+                results[shard] = items
+                print(f"Window {shard[0]} .. {shard[1]}: {len(items)} contracts")
+            pending = failed
+
+    for start_date, end_date, _ in pending:
+        print(f"✗ Window {start_date} .. {end_date} failed after {SHARD_RETRIES} retries")
+
+    # Merge newest window first, keeping the first copy of each id
+    contracts = []
+    seen_ids = set()
+    for shard in shards:
+        for item in results.get(shard, []):
+            contract = parse(item)
+            if contract.id in seen_ids:
+                continue
+            seen_ids.add(contract.id)
+            contracts.append(contract)
+
+    print(f"Backfill: {len(contracts)} unique contracts from {len(results)}/{len(shards)} windows")
+    if pending:
+        raise IncompleteScrape(f"{len(pending)} date window(s) failed", contracts)
+    return contracts
+
+
+def iter_backfill(scrape):
+    """A backfill as a single page for run_pipeline
+
+    An incomplete backfill still hands over what it fetched, then re-raises
+    so the sinks are aborted rather than closed.
+    """
+    try:
+        contracts = scrape()
+    except IncompleteScrape as e:
+        if e.contracts:
+            yield e.contracts
+        raise
+    yield contracts
+
@@ -0,0 +1,84 @@
+"""
+Shared HTTP session for the contracts API
+One long-lived curl_cffi Session keeps connections alive (HTTP/2 where the
+server offers it) across the cookie check, every page fetch and refreshes
+"""
+import threading
+
+from curl_cffi import requests
+
+# curl's CURLINFO_HTTP_VERSION codes
+HTTP_VERSIONS = {1: 'HTTP/1.0', 2: 'HTTP/1.1', 3: 'HTTP/2', 30: 'HTTP/3'}
+
+
+class ScraperSession:
+    """Long-lived curl_cffi session with connection reuse counters
+
+    The cookie jar holds the cookies every request is sent with; cookies is
+    the dict they were last set from, so a caller can tell which cookies a
+    rejected request carried.
+    """
+
+    def __init__(self, headers=None, cookies=None, impersonate='chrome'):
+        self.session = requests.Session(headers=headers, impersonate=impersonate)
+        self.lock = threading.Lock()
+        self.cookies = {}
+        if cookies:
+            self.set_cookies(cookies)
+        self.seen_connections = set()
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.http_versions = {}
+
+    def set_cookies(self, cookies):
+        """Send these cookies from now on (e.g. after a cookie refresh)
+
+        Values are overwritten in place rather than the jar being cleared
+        first, so a request going out from another thread meanwhile never
+        goes without cookies.
+        """
+        with self.lock:
+            self.session.cookies.update({k: v for k, v in cookies.items() if v})
+            self.cookies = dict(cookies)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        """Send a request over the pooled connections and record reuse stats"""
+        response = self.session.request(method, url, **kwargs)
+        self._record(response)
+        return response
+
+    def _record(self, response):
+        # A connection is identified by its local address - a new local port
+        # means curl had to open (and TLS-handshake) a new connection
+        connection = (getattr(response, 'local_ip', ''), getattr(response, 'local_port', 0))
+        version = HTTP_VERSIONS.get(getattr(response, 'http_version', 0), 'unknown')
+        with self.lock:
+            if connection in self.seen_connections:
+                self.connections_reused += 1
+            else:
+                self.seen_connections.add(connection)
+                self.connections_opened += 1
+            self.http_versions[version] = self.http_versions.get(version, 0) + 1
+
+    def stats(self):
+        """Connection counters as a dict"""
+        with self.lock:
+            return {
+                'requests': self.connections_opened + self.connections_reused,
+                'connections_opened': self.connections_opened,
+                'connections_reused': self.connections_reused,
+                'http_versions': dict(self.http_versions),
+            }
+
+    def print_stats(self):
+        stats = self.stats()
+        versions = ', '.join(f"{v}: {n}" for v, n in stats['http_versions'].items()) or '-'
+        print(f"HTTP session: {stats['requests']} requests, "
+              f"{stats['connections_opened']} connections opened, "
+              f"{stats['connections_reused']} reused ({versions})")
+
+    def close(self):
+        self.session.close()
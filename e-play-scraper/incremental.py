@@ -0,0 +1,70 @@
+"""
+Incremental scraping support
+Checks scraped pages against the content hashes in the contract store so a
+run can stop paginating at the first page that has nothing new
+"""
+import hashlib
+import json
+import os
+
+from contract import Contract
+from page_fetcher import IncompleteScrape
+
+INCREMENTAL = os.getenv('INCREMENTAL', 'false').lower() == 'true'
+DATASET_FILE = os.getenv('DATASET_FILE', 'contracts.json')  # Seeds an empty contract store
+
+
+def contract_hash(contract):
+    """Stable content hash of one contract"""
+    encoded = json.dumps(contract.to_dict(), sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+class SeenIndex:
+    """id -> content hash for every contract we already have"""
+
+    def __init__(self, hashes=None):
+        self.hashes = hashes or {}
+
+    def is_known(self, contract):
+        """True if we have this id and its content hasn't changed"""
+        return self.hashes.get(str(contract.id)) == contract_hash(contract)
+
+    def page_is_known(self, contracts):
+        """True if a (non-empty) page only holds known, unchanged contracts"""
+        return bool(contracts) and all(self.is_known(c) for c in contracts)
+
+
+def load_dataset(path=DATASET_FILE):
+    """Load a contracts.json dataset (newest first), or [] if there is none"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [Contract.from_dict(c) for c in json.load(f)]
+
+
+def run_incremental(scrape, store):
+    """Scrape only until the first known page and merge into the contract store
+
+    scrape is called as scrape(known=SeenIndex) and returns the contracts
+    it collected. An empty store is seeded from DATASET_FILE first, if the
+    file exists (datasets kept before the store existed).
+
+    Returns True if the scrape completed. An incomplete one merges nothing:
+    a gap behind stored pages would otherwise never be walked again.
+    """
+    if not store.count() and os.path.exists(DATASET_FILE):
+        added, _ = store.merge(load_dataset())
+        print(f"Seeded {store.path} with {added} contracts from {DATASET_FILE}")
+
+    index = SeenIndex(store.hashes())
+    print(f"Incremental mode: {len(index.hashes)} known contracts in {store.path}")
+
+    try:
+        scraped = scrape(known=index)
+    except IncompleteScrape as e:
+        print(f"⚠️  Scrape incomplete: {e} - nothing merged")
+        return False
+    added, changed = store.merge(scraped)
+    print(f"Incremental merge: {added} new, {changed} changed, {store.count()} total")
+    return True
@@ -0,0 +1,311 @@
+"""
+Local stand-in for https://e-play.pl/wp-json/contracts/v1/filter
+Serves a synthetic (or recorded) corpus with the same request/response shape
+the scrapers rely on, with configurable latency, errors and page drift
+
+Run:  python mock_server.py
+Then: API_URL=http://127.0.0.1:8765/wp-json/contracts/v1/filter python cloud_scraper.py
+"""
+import json
+import math
+import os
+import random
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILTER_PATH = '/wp-json/contracts/v1/filter'
+FLAGS = ('retail', 'acquisition', 'startup', 'rebranding')
+
+# Server config (env vars so it runs the same way as the scrapers)
+MOCK_PORT = int(os.getenv('MOCK_PORT', '8765'))
+MOCK_CONTRACTS = int(os.getenv('MOCK_CONTRACTS', '5000'))  # Synthetic corpus size
+MOCK_CORPUS_FILE = os.getenv('MOCK_CORPUS_FILE', '')  # Recorded items/responses JSON instead
+MOCK_LATENCY_MS = float(os.getenv('MOCK_LATENCY_MS', '0'))
+MOCK_JITTER_MS = float(os.getenv('MOCK_JITTER_MS', '0'))
+MOCK_ERROR_403 = float(os.getenv('MOCK_ERROR_403', '0'))  # Fraction of requests answered 403
+MOCK_ERROR_5XX = float(os.getenv('MOCK_ERROR_5XX', '0'))  # Fraction answered 500/502/503
+MOCK_DRIFT_PER_MIN = float(os.getenv('MOCK_DRIFT_PER_MIN', '0'))  # New contracts per minute
+MOCK_CLEARANCE = os.getenv('MOCK_CLEARANCE', '')  # cf_clearance cookie API requests must carry (empty = none)
+
+MARKETS = ['pl', 'de', 'cz', 'sk', 'lt', 'lv', 'ee', 'ua', 'ro', 'hu']
+COMPANIES = [
+    'Allegro', 'Orlen', 'Zabka', 'Biedronka', 'Lidl', 'Rossmann', 'Empik', 'CCC', 'LPP',
+    'Pepco', 'Dino', 'Auchan', 'Carrefour', 'Decathlon', 'IKEA', 'Media Expert', 'x-kom'
+]
+
+
+def _mix(i, salt):
+    """Cheap deterministic hash of an index (no per-item RNG objects)"""
+    return ((i + 1) * 2654435761 + salt * 40503) & 0xFFFFFFFF
+
+
+class SyntheticCorpus:
+    """Deterministic fake contracts, newest first, generated on demand
+
+    Index 0 is the newest contract. Negative indexes are contracts that
+    "arrived" after start-up (page drift). Dates only go down as the index
+    goes up, so date filters are resolved by bisection instead of a scan.
+    """
+
+    def __init__(self, size, start=date(2015, 1, 1), end=None):
+        self.size = size
+        self.end = end or date.today()
+        self.days = max((self.end - start).days, 1)
+        self.top_id = 100000 + size
+
+    def __len__(self):
+        return self.size
+
+    def date_of(self, i):
+        return self.end - timedelta(days=max(i, 0) * self.days // max(self.size, 1))
+
+    def flags_of(self, i):
+        bits = _mix(i, 7)
+        return {flag: (bits >> (n * 3)) & 7 == 0 for n, flag in enumerate(FLAGS)}
+
+    def item(self, i):
+        bits = _mix(i, 1)
+        company1 = COMPANIES[bits % len(COMPANIES)]
+        company2 = COMPANIES[(bits >> 8) % len(COMPANIES)] if bits & 0x10000 else ''
+        markets = [MARKETS[(bits >> 4) % len(MARKETS)]]
+        if bits & 0x20000:
+            markets.append(MARKETS[(bits >> 12) % len(MARKETS)])
+        contract_id = self.top_id - i
+        slug = f"umowa-{contract_id}"
+        return {
+            'id': contract_id,
+            'url': f"https://e-play.pl/umowy/{slug}/",
+            'subject1': company1,
+            'subject2': company2,
+            'subject': f"{company1} 🤝 {company2}" if company2 else company1,
+            'company1': {'name': company1},
+            'company2': {'name': company2},
+            'date': self.date_of(i).isoformat(),
+            'market': markets,
+            'flags': self.flags_of(i),
+            'payments': bool(bits & 0x40000),
+        }
+
+    def date_range(self, date_from, date_to):
+        """Index range [lo, hi) of contracts dated within [date_from, date_to]"""
+        key = lambda i: -self.date_of(i).toordinal()
+        lo = bisect_left(range(self.size), -date_to.toordinal(), key=key) if date_to else 0
+        hi = bisect_right(range(self.size), -date_from.toordinal(), key=key) if date_from else self.size
+        return lo, max(lo, hi)
+
+
+class RecordedCorpus:
+    """Contracts loaded from a JSON file of raw API items (newest first)
+
+    Accepts a list of items, a single response, or a list of responses.
+    """
+
+    def __init__(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = [data]
+        items = []
+        for entry in data:
+            items.extend(entry.get('items', []) if 'items' in entry else [entry])
+        self.items = items
+        self.top_id = max((int(item.get('id') or 0) for item in items), default=0)
+
+    def __len__(self):
+        return len(self.items)
+
+    def date_of(self, i):
+        value = self.items[max(i, 0)].get('date', '') if self.items else ''
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return date.today()
+
+    def flags_of(self, i):
+        return self.items[max(i, 0)].get('flags', {}) if self.items else {}
+
+    def item(self, i):
+        if i >= 0:
+            return self.items[i]
+        # Drifted contract: a copy of the newest one with a fresh id
+        item = dict(self.items[0]) if self.items else {}
+        item['id'] = self.top_id - i
+        item['date'] = date.today().isoformat()
+        return item
+
+    def date_range(self, date_from, date_to):
+        return 0, len(self.items)
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(str(value)[:10]) if value else None
+    except ValueError:
+        return None
+
+
+class MockContractsServer:
+    """Threaded HTTP server implementing the filter endpoint contract"""
+
+    def __init__(self, corpus=None, port=MOCK_PORT, host='127.0.0.1', latency_ms=MOCK_LATENCY_MS,
+                 jitter_ms=MOCK_JITTER_MS, error_403=MOCK_ERROR_403, error_5xx=MOCK_ERROR_5XX,
+                 drift_per_min=MOCK_DRIFT_PER_MIN, clearance=MOCK_CLEARANCE):
+        if corpus is None:
+            corpus = RecordedCorpus(MOCK_CORPUS_FILE) if MOCK_CORPUS_FILE else SyntheticCorpus(MOCK_CONTRACTS)
+        self.corpus = corpus
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_403 = error_403
+        self.error_5xx = error_5xx
+        self.drift_per_min = drift_per_min
+        self.clearance = clearance  # Change it to expire the cookies clients hold
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.status_counts = {}
+        self.selection_cache = {}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True  # Headers and body go out as separate writes
+
+            def do_POST(self):
+                length = int(self.headers.get('content-length') or 0)
+                body = self.rfile.read(length) if length else b''
+                if self.path.split('?')[0].rstrip('/') != FILTER_PATH:
+                    return self.reply(404, {'code': 'rest_no_route'})
+                try:
+                    payload = json.loads(body or b'{}')
+                except ValueError:
+                    return self.reply(400, {'code': 'rest_invalid_json'})
+                if not server.cleared(self.headers.get('cookie')):
+                    return self.reply(403, {'code': 'forbidden', 'message': 'Cloudflare: Access denied'})
+                status, data = server.handle(payload)
+                self.reply(status, data)
+
+            def do_GET(self):
+                # The cloudscraper variant visits the site before calling the API
+                self.reply(200, '<html><body>e-play mock</body></html>', 'text/html')
+
+            def reply(self, status, data, content_type='application/json'):
+                body = data.encode('utf-8') if isinstance(data, str) else json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('content-type', content_type)
+                self.send_header('content-length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server.lock:
+                    server.status_counts[status] = server.status_counts.get(status, 0) + 1
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_port}{FILTER_PATH}"
+        self.thread = None
+
+    def cleared(self, cookie_header):
+        """True if a request with this Cookie header passes the clearance check"""
+        if not self.clearance:
+            return True
+        cookie = SimpleCookie(cookie_header or '').get('cf_clearance')
+        return cookie is not None and cookie.value == self.clearance
+
+    def drifted(self):
+        """Number of contracts that have 'arrived' since start-up"""
+        return int((time.monotonic() - self.started) * self.drift_per_min / 60)
+
+    def select(self, payload, drift):
+        """Indexes (newest first) matching the payload's flag and date filters"""
+        wanted = [flag for flag in FLAGS if str(payload.get(flag) or '').lower() in ('1', 'true', 'yes', 'on')]
+        date_from = _parse_date(payload.get('date_from'))
+        date_to = _parse_date(payload.get('date_to'))
+        key = (tuple(wanted), date_from, date_to)
+
+        with self.lock:
+            selection = self.selection_cache.get(key)
+        if selection is None:
+            lo, hi = self.corpus.date_range(date_from, date_to)
+            selection = range(lo, hi)
+            if isinstance(self.corpus, RecordedCorpus) and (date_from or date_to):
+                selection = [i for i in selection
+                             if (not date_from or self.corpus.date_of(i) >= date_from)
+                             and (not date_to or self.corpus.date_of(i) <= date_to)]
+            if wanted:
+                selection = [i for i in selection if all(self.corpus.flags_of(i).get(f) for f in wanted)]
+            with self.lock:
+                self.selection_cache[key] = selection
+
+        today = date.today()
+        new = [-n for n in range(drift, 0, -1)
+               if (not date_from or today >= date_from) and (not date_to or today <= date_to)
+               and all(self.corpus.flags_of(-n).get(f) for f in wanted)]
+        return new, selection
+
+    def handle(self, payload):
+        """Return (status, body) for one filter request"""
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        roll = random.random()
+        if roll < self.error_403:
+            return 403, {'code': 'forbidden', 'message': 'Cloudflare: Access denied'}
+        if roll < self.error_403 + self.error_5xx:
+            return random.choice([500, 502, 503]), {'code': 'server_error'}
+
+        try:
+            page = max(int(payload.get('paged') or 1), 1)
+            quantity = max(int(payload.get('quantity') or 120), 1)
+        except (TypeError, ValueError):
+            return 400, {'code': 'rest_invalid_param'}
+
+        new, selection = self.select(payload, self.drifted())
+        total = len(new) + len(selection)
+        start = (page - 1) * quantity
+        end = min(start + quantity, total)
+        indexes = [new[i] if i < len(new) else selection[i - len(new)] for i in range(start, end)]
+        return 200, {
+            'items': [self.corpus.item(i) for i in indexes],
+            'pagination': {
+                'page': page,
+                'total_pages': max(1, math.ceil(total / quantity)),
+                'total': total
+            }
+        }
+
+    def start(self):
+        """Serve in a background thread (for benchmarks); returns the filter URL"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    server = MockContractsServer()
+    print("=" * 60)
+    print("  E-PLAY MOCK API")
+    print("=" * 60)
+    print(f"Corpus: {len(server.corpus)} contracts"
+          f"{' from ' + MOCK_CORPUS_FILE if MOCK_CORPUS_FILE else ' (synthetic)'}")
+    print(f"Latency: {server.latency_ms:g}ms (+{server.jitter_ms:g}ms jitter), "
+          f"403: {server.error_403:.0%}, 5xx: {server.error_5xx:.0%}, drift: {server.drift_per_min:g}/min")
+    print(f"\nAPI_URL={server.url}\n")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nStopped. Responses by status: {server.status_counts}")
+
+
+if __name__ == '__main__':
+    main()
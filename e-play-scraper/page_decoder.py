@@ -0,0 +1,104 @@
+"""
+Decoding of filter API response bodies
+With msgspec installed, items are decoded straight into Contract records
+against a typed schema (unknown fields skipped); otherwise orjson or the
+stdlib json module produce plain dicts for normalize()
+"""
+import json
+import os
+from typing import Dict, List, Optional, Union
+
+from contract import build
+
+JSON_DECODER = os.getenv('JSON_DECODER', 'auto')  # auto, msgspec, orjson or json
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if msgspec is not None:
+    class _Company(msgspec.Struct):
+        name: str = ''
+
+    class _Flags(msgspec.Struct):
+        retail: bool = False
+        acquisition: bool = False
+        startup: bool = False
+        rebranding: bool = False
+
+    class _Item(msgspec.Struct):
+        # Only the fields normalize() reads; anything else in the payload is skipped
+        id: Union[int, str] = ''
+        url: Optional[str] = None
+        subject1: Optional[str] = None
+        subject2: Optional[str] = None
+        subject: Optional[str] = None
+        company1: Union[_Company, str, None] = None
+        company2: Union[_Company, str, None] = None
+        date: str = ''
+        market: Optional[List[str]] = None
+        flags: Optional[_Flags] = None
+
+    class _Page(msgspec.Struct):
+        items: List[_Item] = []
+        pagination: Dict[str, int] = {}
+
+    _page_decoder = msgspec.json.Decoder(_Page, strict=False)
+
+
+def available_backends():
+    """Decoders usable here, fastest first"""
+    return [name for name, lib in (('msgspec', msgspec), ('orjson', orjson)) if lib] + ['json']
+
+
+def _backend():
+    if JSON_DECODER == 'auto':
+        return available_backends()[0]
+    if JSON_DECODER not in available_backends():
+        print(f"⚠️  JSON_DECODER={JSON_DECODER} not available, using {available_backends()[0]}")
+        return available_backends()[0]
+    return JSON_DECODER
+
+
+BACKEND = _backend()
+
+
+def _record(item):
+    """Contract from a decoded _Item (same field rules as normalize())"""
+    company1 = item.company1
+    company2 = item.company2
+    flags = item.flags
+    return build(
+        item.id, item.url,
+        item.subject1 or (company1.name if isinstance(company1, _Company) else company1 or ''),
+        item.subject2 or (company2.name if isinstance(company2, _Company) else company2 or ''),
+        item.subject, item.date, item.market,
+        *((flags.retail, flags.acquisition, flags.startup, flags.rebranding) if flags else ())
+    )
+
+
+def decode_page(body, backend=None):
+    """Decode one filter response body into {'items': [...], 'pagination': {...}}
+
+    Items are Contract records on the msgspec path and raw dicts otherwise;
+    normalize() accepts both. A body the typed schema rejects is decoded
+    again through the generic path.
+    """
+    backend = backend or BACKEND
+    if backend == 'msgspec':
+        try:
+            page = _page_decoder.decode(body)
+            return {'items': [_record(item) for item in page.items], 'pagination': page.pagination}
+        except msgspec.ValidationError as e:
+            print(f"⚠️  Typed decode failed ({e}), falling back to generic JSON")
+            backend = 'orjson' if orjson else 'json'
+    if backend == 'orjson':
+        return orjson.loads(body)
+    return json.loads(body)
@@ -0,0 +1,340 @@
+"""
+Page walking for the contracts API
+Once page 1 has told us total_pages, the remaining pages are fetched in
+parallel (or one at a time), with optional checkpointing for resumable runs.
+Every request goes through one adaptive rate limiter; pages served from the
+response cache don't
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import response_cache
+from page_decoder import decode_page
+from retry_policy import CircuitOpen
+
+# Concurrency config (set MAX_CONCURRENT_PAGES=1 for the old one-page-at-a-time walk)
+MAX_CONCURRENT_PAGES = int(os.getenv('MAX_CONCURRENT_PAGES', '4'))
+MAX_REQUESTS_PER_SECOND = float(os.getenv('MAX_REQUESTS_PER_SECOND', '2'))  # Starting rate (0 = unlimited)
+MIN_REQUESTS_PER_SECOND = float(os.getenv('MIN_REQUESTS_PER_SECOND', '0.2'))  # Floor when backing off
+RATE_CEILING = float(os.getenv('RATE_CEILING', '8'))  # Highest rate the limiter will climb to
+RATE_INCREASE = float(os.getenv('RATE_INCREASE', '0.1'))  # req/s added per healthy response
+RATE_DECREASE = float(os.getenv('RATE_DECREASE', '0.5'))  # Rate multiplier on an error or slowdown
+LATENCY_FACTOR = float(os.getenv('LATENCY_FACTOR', '2'))  # Slowdown = latency this many times the best seen
+
+
+class RateLimiter:
+    """Token bucket shared by all worker threads, with AIMD rate adjustment
+
+    Each healthy response raises the rate by RATE_INCREASE (up to the
+    ceiling). A failed request, or smoothed latency above LATENCY_FACTOR
+    times the best seen, multiplies it by RATE_DECREASE (down to the floor)
+    - at most once per cooldown, so one bad burst counts once. A rate of 0
+    means unlimited and never adapts.
+    """
+
+    def __init__(self, rate=MAX_REQUESTS_PER_SECOND, floor=MIN_REQUESTS_PER_SECOND, ceiling=RATE_CEILING,
+                 burst=1):
+        self.rate = rate
+        self.floor = min(floor, rate)
+        self.ceiling = max(ceiling, rate)
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.latency = None  # Smoothed (EWMA) response time
+        self.best_latency = None
+        self.cooldown_until = 0
+        self.lock = threading.Lock()
+        self.waited = threading.local()  # Seconds each thread spent waiting, kept out of latency
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.counts = {'ok': 0, 'errors': 0, 'backoffs': 0}
+        self.low = self.high = self.rate
+
+    def wait(self):
+        """Block until the caller is allowed to send the next request"""
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay:
+            self.sleep(delay)
+
+    def sleep(self, seconds):
+        self.waited.total = getattr(self.waited, 'total', 0) + seconds
+        time.sleep(seconds)
+
+    def backoff(self, seconds):
+        """After a failed attempt: slow down, sleep seconds, then wait for a slot"""
+        self.report(False)
+        self.sleep(seconds)
+        self.wait()
+
+    def report(self, ok, latency=None):
+        """Feed back how a request went (latency in seconds, for successes)"""
+        if self.rate <= 0:
+            return
+        with self.lock:
+            if not ok:
+                self.counts['errors'] += 1
+                self._decrease()
+                return
+            self.counts['ok'] += 1
+            if latency is not None:
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+                if self.best_latency is None or self.latency < self.best_latency:
+                    self.best_latency = self.latency
+                else:
+                    self.best_latency += (self.latency - self.best_latency) * 0.01  # Follow a lasting shift slowly
+                if self.latency > self.best_latency * LATENCY_FACTOR:
+                    self._decrease()
+                    return
+            self.rate = min(self.ceiling, self.rate + RATE_INCREASE)
+            self.high = max(self.high, self.rate)
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now < self.cooldown_until:
+            return
+        self.rate = max(self.floor, self.rate * RATE_DECREASE)
+        self.tokens = min(self.tokens, 0)  # No burst straight after backing off
+        self.cooldown_until = now + max(1.0, self.latency or 0)
+        self.counts['backoffs'] += 1
+        self.low = min(self.low, self.rate)
+
+    def call(self, func, *args):
+        """Rate-limited func(*args); a None result or an exception counts as an error"""
+        self.wait()
+        start = time.monotonic()
+        waited = getattr(self.waited, 'total', 0)
+        try:
+            result = func(*args)
+        except Exception:
+            self.report(False)
+            raise
+        # Retries inside func wait through this limiter too; that isn't response time
+        latency = time.monotonic() - start - (getattr(self.waited, 'total', 0) - waited)
+        self.report(result is not None, latency)
+        return result
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts, rate=self.rate, low=self.low, high=self.high, latency=self.latency)
+
+    def print_stats(self, reset=True):
+        """Print the current rate and how it moved since the last call"""
+        s = self.stats()
+        if self.rate <= 0:
+            print("Rate limiter: unlimited")
+            return
+        latency = f", latency {s['latency'] * 1000:.0f}ms" if s['latency'] is not None else ""
+        print(f"Rate limiter: {s['rate']:.2f} req/s now (range {s['low']:.2f}-{s['high']:.2f}), "
+              f"{s['ok']} ok, {s['errors']} errors, {s['backoffs']} backoffs{latency}")
+        if reset:
+            self.reset_stats()
+
+
+# One limiter per process: every worker and scraper variant shares the same budget
+limiter = RateLimiter()
+
+
+def page_payload(page=1, quantity=120, filters=None):
+    """Request body for one page of the filter endpoint"""
+    payload = {
+        'paged': page,
+        'quantity': quantity,
+        'subject': '',
+        'retail': '',
+        'acquisition': '',
+        'startup': '',
+        'rebranding': '',
+        'payments': '',
+        'date_from': '',
+        'date_to': ''
+    }
+    if filters:
+        payload.update(filters)
+    return payload
+
+
+def fetch_cached(send, payload):
+    """Decoded response for payload - from the response cache, else send(payload) through the limiter
+
+    send(payload) makes the request and returns the decoded response or
+    None. A cache hit takes no limiter token and adds no latency sample, and
+    a CACHE_ONLY miss is just None, not a failed request that slows the rate.
+    """
+    cached = response_cache.get(payload)
+    if cached is not None:
+        return decode_page(cached)
+    if response_cache.CACHE_ONLY:
+        return None
+    return limiter.call(send, payload)
+
+
+class IncompleteScrape(RuntimeError):
+    """A walk missed pages; raised after its last page so nothing treats the run as complete
+
+    contracts holds what was fetched, for scrapes that return everything at
+    once (backfills) rather than yielding it page by page.
+    """
+
+    def __init__(self, message, contracts=None):
+        super().__init__(message)
+        self.contracts = contracts
+
+
+def fetch_pages_concurrently(fetch_page, pages, max_workers=None, requests_per_second=None):
+    """Fetch pages in parallel, yielding (page, data) in page order
+
+    fetch_page is called as fetch_page(page) and should return the parsed
+    JSON response, or None on failure. It is expected to go through the
+    shared limiter itself (see fetch_cached), unless requests_per_second
+    asks for a fixed rate of its own. At most max_workers * 2 pages are
+    submitted ahead of the consumer, so a slow consumer holds that many
+    responses, not every remaining page.
+    """
+    max_workers = max_workers or MAX_CONCURRENT_PAGES
+    rate = None if requests_per_second is None else RateLimiter(requests_per_second)
+
+    def fetch(page):
+        try:
+            return rate.call(fetch_page, page) if rate else fetch_page(page)
+        except CircuitOpen:
+            raise
+        except Exception as e:
+            print(f"Error fetching page {page}: {e}")
+            return None
+
+    pages = list(pages)
+    if rate is None:
+        pace = f"adaptive rate, now {limiter.rate:g} req/s"
+    else:
+        pace = f"{rate.rate:g} req/s" if rate.rate > 0 else "no rate limit"
+    print(f"Fetching {len(pages)} pages with {max_workers} workers ({pace})...")
+
+    upcoming = iter(pages)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Futures in page order; one more is submitted for each page handed on
+        window = deque((page, executor.submit(fetch, page)) for page in islice(upcoming, max_workers * 2))
+        try:
+            while window:
+                page, future = window.popleft()
+                data = future.result()
+                for next_page in islice(upcoming, 1):
+                    window.append((next_page, executor.submit(fetch, next_page)))
+                yield page, data
+        finally:
+            # Consumer stopped early (or a fetch raised): don't fetch what nobody will read
+            for _, future in window:
+                future.cancel()
+
+
+def iter_contract_pages(fetch_page, parse, known=None, checkpoint=None, first_page=None):
+    """Walk the contracts API, yielding (page, total_pages, contracts) in page order
+
+    fetch_page(page) returns the parsed JSON response or None (rate limited
+    by fetch_cached), parse maps an API item to a contract. Page 1 is
+    fetched alone to learn total_pages.
+
+    known: SeenIndex - walk sequentially and stop at the first page that only
+        holds known contracts (incremental mode)
+    checkpoint: Checkpoint - journal every completed page and replay the
+        pages of an interrupted run instead of re-fetching them
+    first_page: page 1 response already fetched (by the change probe), used
+        instead of fetching it again
+
+    Raises IncompleteScrape once the pages it could fetch have been yielded
+    if any page failed, so callers keep what they have but skip the cleanup
+    a complete run allows (dropping contracts it didn't see).
+    """
+    data = first_page or fetch_page(1)
+    if not data:
+        raise IncompleteScrape("Page 1 failed")
+
+    items = data.get('items', [])
+    total_pages = data.get('pagination', {}).get('total_pages', 1)
+    print(f"Total pages: {total_pages}")
+    if not items:
+        print("No contracts found")
+        return
+
+    contracts = [parse(item) for item in items]
+    done = set()
+    if checkpoint:
+        done = checkpoint.resume(total_pages, contracts[0].id)
+        checkpoint.save_page(1, contracts)
+    yield 1, total_pages, contracts
+
+    if known is not None and known.page_is_known(contracts):
+        print("Page holds only known contracts - stopping")
+        return
+
+    completed = 1
+    failed = []
+    if MAX_CONCURRENT_PAGES > 1 and known is None:
+        remaining = range(2, total_pages + 1)
+        fetched = fetch_pages_concurrently(fetch_page, [p for p in remaining if p not in done])
+        for page in remaining:
+            if page in done:
+                completed += 1
+                yield page, total_pages, checkpoint.load_page(page)
+                continue
+
+            _, data = next(fetched)
+            if not data:
+                print(f"✗ Page {page} failed - skipping")
+                failed.append(page)
+                continue
+            contracts = [parse(item) for item in data.get('items', [])]
+            if checkpoint:
+                checkpoint.save_page(page, contracts)
+            completed += 1
+            yield page, total_pages, contracts
+    else:
+        page = 1
+        while page < total_pages:
+            page += 1
+            if page in done:
+                completed += 1
+                yield page, total_pages, checkpoint.load_page(page)
+                continue
+
+            data = fetch_page(page)
+            if not data:
+                print(f"✗ Page {page} failed - stopping")
+                failed.append(page)
+                break
+            items = data.get('items', [])
+            if not items:
+                print("No more contracts found")
+                total_pages = page - 1
+                break
+
+            # Follow the API if it reports a different page count mid-walk
+            total_pages = data.get('pagination', {}).get('total_pages', total_pages)
+            contracts = [parse(item) for item in items]
+            if checkpoint:
+                checkpoint.save_page(page, contracts)
+            completed += 1
+            yield page, total_pages, contracts
+
+            if known is not None and known.page_is_known(contracts):
+                print("Page holds only known contracts - stopping")
+                break
+
+    if checkpoint:
+        if completed >= total_pages and not failed:
+            checkpoint.clear()
+        else:
+            print(f"⚠️  {total_pages - completed} pages missing - checkpoint kept, rerun to resume")
+    if failed:
+        raise IncompleteScrape(f"{len(failed)} page(s) failed ({', '.join(map(str, failed))})")
@@ -0,0 +1,442 @@
+"""
+Streaming output for the scrapers
+Pages of contracts flow through every sink as they arrive, so nothing holds the
+whole dataset - peak memory is one page plus whatever a sink buffers
+"""
+import csv
+import gzip
+import hashlib
+import json
+import os
+
+import response_cache
+from change_probe import CHANGE_PROBE, ChangeProbe
+from changelog import CHANGELOG_FILE, Changelog
+from checkpoint import CHECKPOINT, Checkpoint
+from contract import normalize
+from contract_store import ContractStore, StoreSink, parse_date
+from date_shards import BACKFILL, backfill, iter_backfill
+from incremental import INCREMENTAL, run_incremental
+from page_fetcher import IncompleteScrape, iter_contract_pages, limiter
+from sheets import open_sink
+
+JSONL_FILE = os.getenv('JSONL_FILE', '')  # Also stream contracts to this JSON Lines file (.gz / .zst compressed)
+ARROW_FILE = os.getenv('ARROW_FILE', '')  # Also export a columnar .parquet (or .arrow / .feather) file
+ARROW_ROW_GROUP = int(os.getenv('ARROW_ROW_GROUP', '65536'))  # Rows per Parquet row group
+QUANTITY = 120  # Contracts per page (the API's maximum)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+CSV_FIELDS = [
+    'id', 'link', 'company1', 'company2', 'subjects',
+    'date', 'country', 'markets', 'contract_slug',
+    'flag_retail', 'flag_acquisition', 'flag_startup', 'flag_rebranding'
+]
+
+
+def csv_row(c):
+    """CSV row for a contract, flags as their own columns"""
+    return {
+        'id': c.id,
+        'link': c.link,
+        'company1': c.company1,
+        'company2': c.company2,
+        'subjects': c.subjects,
+        'date': c.date,
+        'country': c.country,
+        'markets': c.markets,
+        'contract_slug': c.contract_slug,
+        'flag_retail': c.retail,
+        'flag_acquisition': c.acquisition,
+        'flag_startup': c.startup,
+        'flag_rebranding': c.rebranding
+    }
+
+
+class FileSink:
+    """Base for file sinks
+
+    Writes go to path + '.tmp', which only replaces path on close - an
+    interrupted run leaves the previous file untouched. Subclasses provide
+    write(contracts), adding what they wrote to count.
+    """
+
+    newline = None
+    binary = False
+    keep_empty = True  # False: a run that wrote nothing keeps the old file
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = path + '.tmp'
+        if self.binary:
+            self.file = open(self.tmp_path, 'wb')
+        else:
+            self.file = open(self.tmp_path, 'w', encoding='utf-8', newline=self.newline)
+        self.count = 0
+
+    def finish(self):
+        pass
+
+    def close(self):
+        self.finish()
+        self.file.close()
+        if self.count or self.keep_empty:
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class JsonLinesSink(FileSink):
+    """One JSON contract per line, gzip or zstd compressed for a .gz / .zst path
+
+    A sha256 of the uncompressed lines is kept next to the file (path +
+    '.sha256'); when a run produces the same content the old file is left
+    untouched, so its mtime - and any artifact upload keyed on it - stays put.
+    """
+
+    binary = True
+
+    def __init__(self, path):
+        if path.endswith('.zst') and zstandard is None:
+            path = path[:-len('.zst')]
+            print(f"⚠️  zstandard not installed (pip install zstandard), writing {path} uncompressed")
+        super().__init__(path)
+        self.hash_path = path + '.sha256'
+        self.sha256 = hashlib.sha256()
+        if path.endswith('.gz'):
+            self.out = gzip.GzipFile(fileobj=self.file, mode='wb', mtime=0)  # mtime=0: same content, same bytes
+        elif path.endswith('.zst'):
+            self.out = zstandard.ZstdCompressor().stream_writer(self.file, closefd=False)
+        else:
+            self.out = self.file
+
+    def write(self, contracts):
+        lines = ''.join(json.dumps(c.to_dict(), ensure_ascii=False) + '\n' for c in contracts).encode('utf-8')
+        self.sha256.update(lines)
+        self.out.write(lines)
+        self.count += len(contracts)
+
+    def finish(self):
+        if self.out is not self.file:
+            self.out.close()
+
+    def close(self):
+        self.finish()
+        self.file.close()
+        digest = self.sha256.hexdigest()
+        previous = None
+        if os.path.exists(self.path) and os.path.exists(self.hash_path):
+            with open(self.hash_path, 'r', encoding='utf-8') as f:
+                previous = f.read().strip()
+        if digest == previous:
+            os.remove(self.tmp_path)
+            print(f"{self.path} unchanged, not rewritten")
+            return
+        os.replace(self.tmp_path, self.path)
+        with open(self.hash_path, 'w', encoding='utf-8') as f:
+            f.write(digest + '\n')
+
+
+class JsonArraySink(FileSink):
+    """Pretty-printed JSON list, same bytes as json.dump(contracts, f, indent=2)"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.separator = '[\n  '
+
+    def write(self, contracts):
+        for contract in contracts:
+            # Strings never hold a raw newline in JSON, so re-indenting is safe
+            encoded = json.dumps(contract.to_dict(), indent=2, ensure_ascii=False).replace('\n', '\n  ')
+            self.file.write(self.separator + encoded)
+            self.separator = ',\n  '
+        self.count += len(contracts)
+
+    def finish(self):
+        self.file.write('[]' if self.separator.startswith('[') else '\n]')
+
+
+class CsvSink(FileSink):
+    """CSV with the flags flattened into columns"""
+
+    newline = ''
+    keep_empty = False
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, contracts):
+        self.writer.writerows(csv_row(c) for c in contracts)
+        self.count += len(contracts)
+
+
+if pyarrow is not None:
+    ARROW_SCHEMA = pyarrow.schema([
+        ('id', pyarrow.int64()),
+        ('link', pyarrow.string()),
+        ('company1', pyarrow.string()),
+        ('company2', pyarrow.string()),
+        ('subjects', pyarrow.string()),
+        ('date', pyarrow.date32()),
+        ('country', pyarrow.dictionary(pyarrow.int32(), pyarrow.string())),
+        ('markets', pyarrow.dictionary(pyarrow.int32(), pyarrow.string())),
+        ('contract_slug', pyarrow.string()),
+        ('flag_retail', pyarrow.bool_()),
+        ('flag_acquisition', pyarrow.bool_()),
+        ('flag_startup', pyarrow.bool_()),
+        ('flag_rebranding', pyarrow.bool_())
+    ])
+
+
+class ArrowSink(FileSink):
+    """Columnar export: Parquet for a .parquet path, Arrow IPC (Feather v2) otherwise
+
+    Each page becomes one record batch with typed columns - int64 id, date32
+    date, dictionary-encoded country and markets, boolean flags. Dictionaries
+    only ever grow, so later batches carry deltas rather than replacements.
+    Parquet batches are grouped into row groups of ARROW_ROW_GROUP rows.
+    """
+
+    binary = True
+    keep_empty = False
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.dictionaries = {'country': {}, 'markets': {}}
+        self.parquet = path.endswith('.parquet')
+        self.batches = []
+        self.buffered = 0
+        if self.parquet:
+            self.writer = pyarrow.parquet.ParquetWriter(self.file, ARROW_SCHEMA, compression='zstd')
+        else:
+            options = pyarrow.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+            self.writer = pyarrow.ipc.new_file(self.file, ARROW_SCHEMA, options=options)
+
+    def encode(self, name, values):
+        """Dictionary array over every value seen so far (codes stay stable across batches)"""
+        index = self.dictionaries[name]
+        codes = [index.setdefault(value, len(index)) for value in values]
+        return pyarrow.DictionaryArray.from_arrays(pyarrow.array(codes, pyarrow.int32()),
+                                                   pyarrow.array(list(index), pyarrow.string()))
+
+    def record_batch(self, contracts):
+        strings = lambda name: pyarrow.array([getattr(c, name) for c in contracts], pyarrow.string())
+        flags = lambda name: pyarrow.array([bool(getattr(c, name)) for c in contracts], pyarrow.bool_())
+        return pyarrow.record_batch([
+            pyarrow.array([int(c.id) for c in contracts], pyarrow.int64()),
+            strings('link'),
+            strings('company1'),
+            strings('company2'),
+            strings('subjects'),
+            pyarrow.array([parse_date(c.date) for c in contracts], pyarrow.string()).cast(pyarrow.date32()),
+            self.encode('country', [c.country for c in contracts]),
+            self.encode('markets', [c.markets for c in contracts]),
+            strings('contract_slug'),
+            flags('retail'),
+            flags('acquisition'),
+            flags('startup'),
+            flags('rebranding')
+        ], schema=ARROW_SCHEMA)
+
+    def write(self, contracts):
+        if not contracts:
+            return
+        batch = self.record_batch(contracts)
+        if self.parquet:
+            self.batches.append(batch)
+            self.buffered += len(contracts)
+            if self.buffered >= ARROW_ROW_GROUP:
+                self.flush()
+        else:
+            self.writer.write_batch(batch)
+        self.count += len(contracts)
+
+    def flush(self):
+        if self.batches:
+            self.writer.write_table(pyarrow.Table.from_batches(self.batches), row_group_size=self.buffered)
+            self.batches = []
+            self.buffered = 0
+
+    def finish(self):
+        self.flush()
+        self.writer.close()
+
+    def abort(self):
+        self.batches = []
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+        super().abort()
+
+
+def open_arrow_sink(path):
+    """ArrowSink for path, or None (with a hint) if pyarrow isn't installed"""
+    if pyarrow is None:
+        print("pyarrow not installed, skipping columnar export")
+        print("Install: pip install pyarrow")
+        return None
+    return ArrowSink(path)
+
+
+def iter_contracts(pages):
+    """Flatten pages of contracts into single contracts"""
+    for contracts in pages:
+        yield from contracts
+
+
+def run_pipeline(pages, sinks, failed=None):
+    """Feed each page of contracts to every sink, returning the contract count
+
+    pages is any iterable of contract lists (a scrape generator, or [contracts]
+    for data already in memory). None entries in sinks are ignored. A sink that
+    fails is reported and dropped without stopping the others (and appended to
+    failed, if given); if the scrape itself fails, every sink is aborted so no
+    partial output replaces old files.
+    """
+    failed = [] if failed is None else failed
+    sinks = [sink for sink in sinks if sink is not None]
+    total = 0
+    try:
+        for contracts in pages:
+            total += len(contracts)
+            for sink in list(sinks):
+                try:
+                    sink.write(contracts)
+                except Exception as e:
+                    print(f"✗ {type(sink).__name__} failed: {e}")
+                    sinks.remove(sink)
+                    failed.append(sink)
+                    sink.abort()
+    except BaseException:
+        for sink in sinks:
+            sink.abort()
+        raise
+
+    for sink in sinks:
+        try:
+            sink.close()
+        except Exception as e:
+            print(f"✗ {type(sink).__name__} failed: {e}")
+            failed.append(sink)
+    return total
+
+
+def run_scrape(pages, sink):
+    """Run a scrape into one sink, returning True only if it completed and the sink closed
+
+    An IncompleteScrape is reported rather than raised: the sink was aborted,
+    so it keeps what arrived without the cleanup a complete run allows.
+    """
+    try:
+        run_pipeline(pages, [sink])
+    except IncompleteScrape as e:
+        print(f"⚠️  Scrape incomplete: {e} - stored contracts kept, nothing removed")
+        return False
+    return sink.closed
+
+
+def stream_contracts(fetch_page, known=None, first_page=None, on_page=None):
+    """Scrape all contracts with pagination, yielding one page of contracts at a time
+
+    fetch_page(page, quantity, filters=None) returns a decoded response or
+    None. With a SeenIndex as known, stops at the first page holding only
+    contracts we already have (incremental mode). Full scrapes are
+    checkpointed so an interrupted run resumes where it stopped. first_page
+    is a page 1 response that was already fetched; on_page(page,
+    total_pages, contracts) sees each page before it is passed on.
+    """
+    total = 0
+    checkpoint = Checkpoint() if CHECKPOINT and known is None else None
+    fetch = lambda page: fetch_page(page, QUANTITY)
+
+    for page, total_pages, contracts in iter_contract_pages(fetch, normalize, known, checkpoint, first_page):
+        if on_page:
+            on_page(page, total_pages, contracts)
+        total += len(contracts)
+        print(f"Page {page}/{total_pages}: {len(contracts)} contracts (total: {total})")
+        yield contracts
+
+
+def run_scraper(fetch_page, session=None, policy=None, sheets=None, open_sinks=None, first_page=None,
+                on_page=None, incremental=INCREMENTAL, change_probe=CHANGE_PROBE):
+    """A whole scraper run: probe page 1, scrape into the contract store, export it
+
+    fetch_page(page, quantity, filters=None) is the script's page fetch.
+    session and policy are its ScraperSession and RetryPolicy (for stats).
+    sheets holds open_sink() keyword arguments when the Google Sheets upload
+    is on; open_sinks() returns any other outputs the script writes. Both
+    are only opened once the scrape is done. first_page is a page 1 response
+    the script already has (e.g. from a cookie check). Returns the number of
+    contracts exported, or 0 if the probe found nothing new or the run was
+    incomplete (a page or an output failed), so callers such as the watcher
+    can tell a finished sync from a partial one.
+
+    incremental: only fetch until the first page of known contracts
+    change_probe: end early when page 1 shows nothing new since the last run
+    """
+    # Page 1 doubles as a change probe - the run only goes ahead if something moved
+    probe = ChangeProbe() if change_probe and not BACKFILL else None
+    if probe:
+        first_page = first_page or fetch_page(1)
+        if probe.unchanged(first_page):
+            return 0
+
+    # Scraped pages go into the contract store (backfills and incremental merges arrive in one piece)
+    store = ContractStore(changelog=Changelog() if CHANGELOG_FILE else None)
+    if BACKFILL:
+        scrape = lambda known=None: backfill(fetch_page, normalize)
+    else:
+        scrape = lambda known=None: list(iter_contracts(stream_contracts(fetch_page, known, first_page, on_page)))
+    if incremental:
+        complete = run_incremental(scrape, store)
+    else:
+        pages = iter_backfill(scrape) if BACKFILL else stream_contracts(fetch_page, None, first_page, on_page)
+        complete = run_scrape(pages, StoreSink(store))
+
+    # Outputs are exported from the store a page at a time
+    failed = []
+    sinks = [
+        JsonLinesSink(JSONL_FILE) if JSONL_FILE else None,
+        open_arrow_sink(ARROW_FILE) if ARROW_FILE else None
+    ]
+    sinks.extend(open_sinks() if open_sinks else [])
+    if sheets is not None:
+        sheets_sink = open_sink(**sheets)
+        if sheets_sink is None:
+            # Upload is on but the worksheet couldn't be opened - the run isn't complete
+            failed.append('Google Sheets')
+        sinks.append(sheets_sink)
+    else:
+        print("Google Sheets upload disabled (set UPLOAD_TO_SHEETS=true to enable)")
+
+    total = run_pipeline(store.pages(), sinks, failed)
+    store.close()
+    if probe and complete and not failed:
+        probe.save()
+
+    print(f"\nTotal contracts found: {total}")
+    for stats in (session, limiter, policy, response_cache):
+        if stats is not None:
+            stats.print_stats()
+    if not complete or failed:
+        print("⚠️  Run incomplete - not counted as a successful sync")
+        return 0
+    return total
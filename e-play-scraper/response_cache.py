@@ -0,0 +1,121 @@
+"""
+On-disk response cache for the contracts filter endpoint
+Raw response bodies are keyed by a hash of the normalized payload, stored
+compressed in SQLite, expire after a TTL and are evicted least-recently-used
+past a size cap
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+RESPONSE_CACHE = os.getenv('RESPONSE_CACHE', 'false').lower() == 'true'
+CACHE_ONLY = os.getenv('CACHE_ONLY', 'false').lower() == 'true'  # Offline: never hit the network
+CACHE_FILE = os.getenv('CACHE_FILE', 'response_cache.db')
+CACHE_TTL = int(os.getenv('CACHE_TTL', '3600'))  # Seconds
+CACHE_MAX_MB = float(os.getenv('CACHE_MAX_MB', '200'))
+
+
+def payload_key(payload):
+    """Hash of the payload with paged/quantity as ints and filters as strings"""
+    normalized = {k: (int(v) if k in ('paged', 'quantity') else str(v or '')) for k, v in payload.items()}
+    encoded = json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Compressed SQLite cache of filter responses with TTL and LRU eviction"""
+
+    def __init__(self, path=CACHE_FILE, ttl=CACHE_TTL, max_bytes=int(CACHE_MAX_MB * 1024 * 1024)):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, body BLOB, size INTEGER, created REAL, last_used REAL)'
+            )
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, payload):
+        """Cached response body (bytes) for payload, or None on a miss or expired entry"""
+        key = payload_key(payload)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute('SELECT body, created FROM responses WHERE key = ?', (key,)).fetchone()
+            if row and (CACHE_ONLY or now - row[1] <= self.ttl):
+                self.hits += 1
+                with self.conn:
+                    self.conn.execute('UPDATE responses SET last_used = ? WHERE key = ?', (now, key))
+                return zlib.decompress(row[0])
+            if row:
+                self.expired += 1
+            self.misses += 1
+            return None
+
+    def put(self, payload, body):
+        """Store a response body and evict least recently used entries over the size cap"""
+        body = zlib.compress(body)
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                (payload_key(payload), body, len(body), now, now)
+            )
+            total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total > self.max_bytes:
+                rows = self.conn.execute('SELECT key, size FROM responses ORDER BY last_used').fetchall()
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    self.conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    total -= size
+                    self.evictions += 1
+        return body
+
+    def print_stats(self):
+        lookups = self.hits + self.misses
+        rate = 100 * self.hits / lookups if lookups else 0
+        print(f"Response cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), "
+              f"{self.expired} expired, {self.evictions} evicted")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Shared cache instance, or None when caching is disabled"""
+    global _cache
+    if not (RESPONSE_CACHE or CACHE_ONLY):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+def get(payload):
+    """Cached response body for payload (None on a miss or when caching is off)"""
+    cache = get_cache()
+    return cache.get(payload) if cache else None
+
+
+def put(payload, body):
+    """Cache a successful response body and hand it back"""
+    cache = get_cache()
+    if cache and body is not None:
+        cache.put(payload, body)
+    return body
+
+
+def print_stats():
+    if _cache:
+        _cache.print_stats()
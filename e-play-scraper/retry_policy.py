@@ -0,0 +1,202 @@
+"""
+Retry policy for API requests
+Each failed attempt is classified (network error, 5xx, 429, 403, bad JSON)
+and retried on that class's own backoff schedule and budget. A circuit
+breaker fails fast once the endpoint keeps failing, so a run stops early
+instead of retrying until it times out
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    from curl_cffi.requests import exceptions as curl_errors
+except ImportError:
+    curl_errors = None
+
+RETRY_BACKOFF_SCALE = float(os.getenv('RETRY_BACKOFF_SCALE', '1'))  # Multiplies every backoff (0 = no waiting)
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', '8'))  # Consecutive failed attempts that open the circuit
+BREAKER_WINDOW = int(os.getenv('BREAKER_WINDOW', '20'))  # Recent attempts the failure rate is taken over
+BREAKER_FAILURE_RATE = float(os.getenv('BREAKER_FAILURE_RATE', '0.5'))  # Failure rate over the window that opens it
+BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', '60'))  # Seconds before one trial request is let through
+
+# Bodies that fail to decode (Cloudflare challenge pages, truncated responses)
+DECODE_ERRORS = (ValueError, msgspec.DecodeError) if msgspec is not None else (ValueError,)
+
+# Connection reset/refused, timeouts, DNS failures - curl_cffi's DNSError is a ConnectionError
+NETWORK_ERRORS = (ConnectionError, TimeoutError) + (
+    (curl_errors.ConnectionError, curl_errors.Timeout) if curl_errors is not None else ())
+
+
+class Schedule:
+    """Retry budget and exponential backoff (with jitter) for one failure class"""
+
+    def __init__(self, retries, base, cap):
+        self.retries = retries
+        self.base = base
+        self.cap = cap
+
+    def delay(self, retry):
+        """Seconds to wait before retry number retry (0-based)"""
+        return min(self.cap, self.base * 2 ** retry) * random.uniform(0.5, 1)
+
+
+SCHEDULES = {
+    'network': Schedule(3, 1, 15),  # Connection reset, timeout, DNS
+    'server': Schedule(3, 2, 30),  # 5xx
+    'throttled': Schedule(4, 5, 60),  # 429 - a Retry-After header wins when there is one
+    'auth': Schedule(1, 1, 1),  # 401/403 - one retry, after on_auth renewed the credentials
+    'bad_json': Schedule(1, 1, 5),  # Undecodable body
+    'client': Schedule(0, 0, 0),  # Other 4xx - retrying won't help
+}
+
+
+class CircuitOpen(RuntimeError):
+    """The endpoint kept failing; requests are refused until the cooldown ends"""
+
+
+def classify(error):
+    """Failure class (a SCHEDULES key) of an exception raised by one attempt"""
+    if isinstance(error, NETWORK_ERRORS):
+        return 'network'
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status:  # curl_cffi attaches a status 0 response to transport errors
+        if status == 429:
+            return 'throttled'
+        if status in (401, 403):
+            return 'auth'
+        if status >= 500:
+            return 'server'
+        return 'client'
+    if isinstance(error, DECODE_ERRORS):
+        return 'bad_json'
+    return 'network'
+
+
+def retry_after(error):
+    """Seconds from a numeric Retry-After header, or None"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return max(0.0, float(headers.get('Retry-After')))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Opens after threshold consecutive failures, or when at least failure_rate
+    of the last window attempts failed; then lets one trial through per cooldown
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN, window=BREAKER_WINDOW,
+                 failure_rate=BREAKER_FAILURE_RATE):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failure_rate = failure_rate
+        self.recent = deque(maxlen=window)  # True for each failed attempt
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.trips = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """True if a request may be sent now"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.trial or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.trial = True  # Half-open: this one request decides
+            return True
+
+    def success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                print("✓ Endpoint recovered - circuit closed")
+                self.recent.clear()
+            self.recent.append(False)
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            self.recent.append(True)
+            failing = (self.failures >= self.threshold or len(self.recent) == self.recent.maxlen
+                       and sum(self.recent) >= self.failure_rate * len(self.recent))
+            if self.trial or (self.opened_at is None and failing):
+                if not self.trial:
+                    self.trips += 1
+                    print(f"✗ {self.failures} consecutive / {sum(self.recent)} of the last {len(self.recent)} "
+                          f"attempts failed - circuit open, failing fast for {self.cooldown:g}s")
+                self.opened_at = time.monotonic()
+                self.trial = False
+
+
+class RetryPolicy:
+    """Runs one request attempt after another until it succeeds or its failure class runs out of retries
+
+    Given the shared rate limiter, every failed attempt slows it down and
+    every retry waits for its turn like any other request.
+    """
+
+    def __init__(self, schedules=None, breaker=None, limiter=None, scale=RETRY_BACKOFF_SCALE):
+        self.schedules = dict(SCHEDULES, **(schedules or {}))
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter
+        self.scale = scale
+        self.lock = threading.Lock()
+        self.failures = {outcome: 0 for outcome in self.schedules}
+        self.retries = 0
+
+    def call(self, attempt, label='request', on_auth=None):
+        """Return attempt()'s result, retrying failures by class
+
+        attempt() sends the request and returns the decoded result, raising
+        on any failure (HTTP errors via raise_for_status). on_auth() runs
+        before an auth retry and returns False if the credentials couldn't
+        be renewed, which ends the retries. Raises the last error once the
+        budget is spent, or CircuitOpen while the breaker is open.
+        """
+        used = {}
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpen(f"{label}: endpoint keeps failing, not sent")
+            try:
+                result = attempt()
+            except Exception as error:
+                outcome = classify(error)
+                self.breaker.failure()
+                with self.lock:
+                    self.failures[outcome] += 1
+                schedule = self.schedules[outcome]
+                retry = used.get(outcome, 0)
+                if retry >= schedule.retries or (outcome == 'auth' and on_auth and not on_auth()):
+                    raise
+                used[outcome] = retry + 1
+
+                wait = retry_after(error) if outcome == 'throttled' else None
+                wait = min(schedule.cap, wait) if wait is not None else schedule.delay(retry) * self.scale
+                print(f"⚠️  {label}: {outcome} ({error}) - retry {retry + 1}/{schedule.retries} in {wait:.1f}s")
+                with self.lock:
+                    self.retries += 1
+                if self.limiter is not None:
+                    self.limiter.backoff(wait)
+                else:
+                    time.sleep(wait)
+                continue
+            self.breaker.success()
+            return result
+
+    def print_stats(self):
+        failed = ', '.join(f"{outcome} {n}" for outcome, n in self.failures.items() if n)
+        print(f"Retries: {self.retries} (failed attempts: {failed or 'none'}), "
+              f"circuit opened {self.breaker.trips} time(s)")
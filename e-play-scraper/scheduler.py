@@ -1,6 +1,7 @@
 """
 Scheduler for cloud platforms (Railway, Render, etc.)
-Runs scraper on a schedule
+Runs scraper on a schedule, or with WATCH_MODE=true polls for new contracts
+and syncs them within seconds
 """
 import schedule
 import time
@@ -10,7 +11,12 @@ import os
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from cloud_scraper import main
+from cloud_scraper import fetch_contracts_page, main
+from contract import normalize
+from contract_store import ContractStore
+from watch import WATCH_QUANTITY, watch
+
+WATCH_MODE = os.getenv('WATCH_MODE', 'false').lower() == 'true'
 
 def run_scraper():
     """Wrapper to run scraper and handle errors"""
@@ -25,6 +31,27 @@ def run_scraper():
         import traceback
         traceback.print_exc()
 
+def poll_newest():
+    """(id, date) pairs on a small page 1, newest first - None if the request failed, CircuitOpen while the breaker is open"""
+    data = fetch_contracts_page(1, WATCH_QUANTITY)
+    if not data:
+        return None
+    contracts = [normalize(item) for item in data.get('items', [])]
+    return [(str(contract.id), contract.date) for contract in contracts]
+
+
+def known_ids():
+    store = ContractStore()
+    ids = set(store.hashes())
+    store.close()
+    return ids
+
+
+if WATCH_MODE:
+    # The poll already saw something new; incremental syncs stop at the first known page
+    watch(poll_newest, lambda: main(incremental=True, change_probe=False), known_ids())
+    sys.exit(0)
+
 # Run daily at 2 AM UTC
 schedule.every().day.at("02:00").do(run_scraper)
 
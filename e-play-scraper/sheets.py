@@ -0,0 +1,612 @@
+"""
+Google Sheets output shared by the scrapers
+Opens (or creates) the target worksheet and streams contract rows into it
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from sheets_quota import quota
+
+SHEETS_SYNC = os.getenv('SHEETS_SYNC', 'delta')  # delta: send only changes, full/chunked: clear and rewrite
+SHEETS_CHUNK_ROWS = int(os.getenv('SHEETS_CHUNK_ROWS', '5000'))  # Rows per append call (full sync)
+SHEETS_CHUNK_CELLS = int(os.getenv('SHEETS_CHUNK_CELLS', '40000'))  # Cells per range write (chunked sync)
+SHEETS_WRITERS = int(os.getenv('SHEETS_WRITERS', '4'))  # Range writes in flight at once (chunked sync)
+SHEETS_CHUNK_RETRIES = int(os.getenv('SHEETS_CHUNK_RETRIES', '3'))  # Retries of one failed range write
+SHEETS_MANIFEST_FILE = os.getenv('SHEETS_MANIFEST_FILE', 'sheets_manifest.json')  # Remote state after last sync
+SHEETS_HANDLES_FILE = os.getenv('SHEETS_HANDLES_FILE', 'sheets_handles.json')  # Resolved spreadsheet/worksheet ids
+
+SCOPE = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive'
+]
+
+SHEET_HEADERS = [
+    'ID', 'Link', 'Company 1', 'Company 2', 'Subjects',
+    'Date', 'Country', 'Markets', 'Contract Slug',
+    'Retail', 'Acquisition', 'Startup', 'Rebranding'
+]
+
+# Kept for the life of the process, so a long-running scheduler authorizes once:
+# credentials source -> authorized client (its Credentials refresh the token as needed)
+_clients = {}
+# 'spreadsheet/worksheet' name -> {'spreadsheet_id', 'worksheet_id'}, mirrored to SHEETS_HANDLES_FILE
+_handles = None
+
+HEADER_FORMAT = {
+    'textFormat': {'bold': True},
+    'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9}
+}
+
+
+def sheet_row(c):
+    """One worksheet row for a contract"""
+    return [
+        c.id,
+        c.link,
+        c.company1,
+        c.company2,
+        c.subjects,
+        c.date,
+        c.country,
+        c.markets,
+        c.contract_slug,
+        'Yes' if c.retail else '',
+        'Yes' if c.acquisition else '',
+        'Yes' if c.startup else '',
+        'Yes' if c.rebranding else ''
+    ]
+
+
+def row_hash(row):
+    """Content hash of a row as the sheet displays it (every cell as a string)"""
+    encoded = '\x1f'.join(str(value) for value in row)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def build_sheet_rows(contracts):
+    """Header row plus one row per contract"""
+    return [SHEET_HEADERS] + [sheet_row(c) for c in contracts]
+
+
+def _cell(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+
+def update_cells_request(sheet_id, row_index, rows):
+    """batchUpdate request writing rows (RAW values) from row_index, column A"""
+    return {'updateCells': {
+        'start': {'sheetId': sheet_id, 'rowIndex': row_index, 'columnIndex': 0},
+        'rows': [{'values': [_cell(value) for value in row]} for row in rows],
+        'fields': 'userEnteredValue'
+    }}
+
+
+def append_cells_request(sheet_id, rows):
+    """batchUpdate request appending rows after the last row with data (grows the grid)"""
+    return {'appendCells': {
+        'sheetId': sheet_id,
+        'rows': [{'values': [_cell(value) for value in row]} for row in rows],
+        'fields': 'userEnteredValue'
+    }}
+
+
+def clear_request(sheet_id):
+    """batchUpdate request clearing every value on the sheet (formatting is kept)"""
+    return {'updateCells': {'range': {'sheetId': sheet_id}, 'fields': 'userEnteredValue'}}
+
+
+def header_format_request(sheet_id, columns=len(SHEET_HEADERS)):
+    return {'repeatCell': {
+        'range': {'sheetId': sheet_id, 'startRowIndex': 0, 'endRowIndex': 1,
+                  'startColumnIndex': 0, 'endColumnIndex': columns},
+        'cell': {'userEnteredFormat': HEADER_FORMAT},
+        'fields': 'userEnteredFormat(textFormat,backgroundColor)'
+    }}
+
+
+def auto_resize_request(sheet_id, columns=len(SHEET_HEADERS)):
+    return {'autoResizeDimensions': {
+        'dimensions': {'sheetId': sheet_id, 'dimension': 'COLUMNS', 'startIndex': 0, 'endIndex': columns}
+    }}
+
+
+def grid_size_request(sheet_id, rows=None, columns=None):
+    """batchUpdate request resizing the grid (rows beyond the new size are dropped)"""
+    properties = {}
+    if rows is not None:
+        properties['rowCount'] = rows
+    if columns is not None:
+        properties['columnCount'] = columns
+    return {'updateSheetProperties': {
+        'properties': {'sheetId': sheet_id, 'gridProperties': properties},
+        'fields': ','.join(f'gridProperties.{key}' for key in properties)
+    }}
+
+
+def a1_range(title, first_row, last_row, columns=len(SHEET_HEADERS)):
+    """A1 range of whole rows first_row..last_row (1-based) on the worksheet titled title"""
+    quoted = title.replace("'", "''")
+    return f"'{quoted}'!A{first_row}:{chr(ord('A') + columns - 1)}{last_row}"
+
+
+def authorize(credentials_json='', credentials_file=''):
+    """Authorized gspread client, or None if gspread or credentials are missing
+
+    credentials_json is a service account JSON string (optionally base64),
+    credentials_file a path to the service account JSON file. The client is
+    built once per credentials source and reused by later calls.
+    """
+    try:
+        import gspread
+        from google.oauth2.service_account import Credentials
+    except ImportError:
+        print("gspread not installed, skipping Google Sheets upload")
+        print("Install: pip install gspread google-auth")
+        return None
+
+    key = credentials_json or credentials_file
+    if key in _clients:
+        return _clients[key]
+
+    if credentials_json:
+        try:
+            info = json.loads(base64.b64decode(credentials_json).decode('utf-8'))
+        except ValueError:
+            info = json.loads(credentials_json)
+        creds = Credentials.from_service_account_info(info, scopes=SCOPE)
+    elif credentials_file and os.path.exists(credentials_file):
+        creds = Credentials.from_service_account_file(credentials_file, scopes=SCOPE)
+    else:
+        print(f"No Google Sheets credentials ({credentials_file or 'SHEETS_CREDENTIALS_JSON'} not set), skipping upload")
+        return None
+
+    client = _clients[key] = quota.install(gspread.authorize(creds))
+    return client
+
+
+def _load_handles(path=SHEETS_HANDLES_FILE):
+    global _handles
+    if _handles is None:
+        _handles = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    _handles = json.load(f)
+            except ValueError:
+                pass
+    return _handles
+
+
+def _save_handles(path=SHEETS_HANDLES_FILE):
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(_handles, f, indent=2)
+    except OSError as e:
+        print(f"⚠️  Could not save sheet handles: {e}")
+
+
+def open_by_id(client, spreadsheet_id, worksheet_id):
+    """(spreadsheet, worksheet) by their ids - no Drive search by name"""
+    spreadsheet = client.open_by_key(spreadsheet_id)
+    return spreadsheet, spreadsheet.get_worksheet_by_id(worksheet_id)
+
+
+def open_worksheet(spreadsheet_name, worksheet_name, credentials_json='', credentials_file='',
+                   handles_file=SHEETS_HANDLES_FILE):
+    """Return (spreadsheet, worksheet), or None if gspread or credentials are missing
+
+    Ids resolved from the names are remembered (in memory and in
+    handles_file), so later opens go by key instead of searching Drive for
+    the spreadsheet name. A remembered id that no longer opens is dropped
+    and the names are resolved again.
+    """
+    client = authorize(credentials_json, credentials_file)
+    if client is None:
+        return None
+    import gspread
+
+    handles = _load_handles(handles_file)
+    name = f"{spreadsheet_name}/{worksheet_name}"
+    known = handles.get(name)
+    if known:
+        try:
+            return open_by_id(client, known['spreadsheet_id'], known['worksheet_id'])
+        except (gspread.exceptions.GSpreadException, KeyError) as e:
+            print(f"⚠️  Stored sheet ids for {name} no longer valid ({e}), looking up by name")
+
+    try:
+        spreadsheet = client.open(spreadsheet_name)
+    except gspread.exceptions.SpreadsheetNotFound:
+        spreadsheet = client.create(spreadsheet_name)
+
+    try:
+        worksheet = spreadsheet.worksheet(worksheet_name)
+    except gspread.exceptions.WorksheetNotFound:
+        # Sized to the header; every sink grows the grid as rows arrive
+        worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows=1, cols=len(SHEET_HEADERS))
+
+    handles[name] = {'spreadsheet_id': spreadsheet.id, 'worksheet_id': worksheet.id}
+    _save_handles(handles_file)
+    return spreadsheet, worksheet
+
+
+class SheetsSink:
+    """Rewrites the worksheet from a stream of contract pages
+
+    Rows are buffered and appended SHEETS_CHUNK_ROWS at a time, which keeps
+    memory bounded without spending one write request per page. Clearing,
+    the header and its format go out together in the first batch_update.
+    """
+
+    def __init__(self, spreadsheet, worksheet, chunk_rows=SHEETS_CHUNK_ROWS):
+        self.spreadsheet = spreadsheet
+        self.worksheet = worksheet
+        self.chunk_rows = chunk_rows
+        self.pending = []
+        self.rows = 0
+
+        spreadsheet.batch_update({'requests': [
+            clear_request(worksheet.id),
+            update_cells_request(worksheet.id, 0, [SHEET_HEADERS]),
+            header_format_request(worksheet.id)
+        ]})
+
+    def write(self, contracts):
+        self.pending.extend(sheet_row(c) for c in contracts)
+        if len(self.pending) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.spreadsheet.batch_update({'requests': [append_cells_request(self.worksheet.id, self.pending)]})
+            self.rows += len(self.pending)
+            self.pending = []
+
+    def close(self):
+        self.flush()
+        print(f"✓ Uploaded {self.rows} rows to Google Sheets: {self.spreadsheet.url}")
+        quota.print_stats()
+
+    def abort(self):
+        self.pending = []
+        print(f"⚠️  Google Sheets upload stopped after {self.rows} rows")
+        quota.print_stats()
+
+
+class ChunkedSheetsSink:
+    """Rewrites the worksheet in range chunks written in parallel
+
+    For very large sheets. Rows are cut into chunks of about
+    SHEETS_CHUNK_CELLS cells and written through the values API by up to
+    SHEETS_WRITERS threads; a chunk that fails is retried on its own
+    (SHEETS_CHUNK_RETRIES times) instead of failing the upload. The grid
+    grows ahead of the writes and is trimmed to fit the data on close.
+    """
+
+    def __init__(self, spreadsheet, worksheet, chunk_cells=SHEETS_CHUNK_CELLS, writers=SHEETS_WRITERS,
+                 retries=SHEETS_CHUNK_RETRIES):
+        self.spreadsheet = spreadsheet
+        self.worksheet = worksheet
+        self.chunk_rows = max(chunk_cells // len(SHEET_HEADERS), 1)
+        self.writers = max(writers, 1)
+        self.retries = retries
+        self.pool = ThreadPoolExecutor(max_workers=self.writers)
+        self.inflight = set()
+        self.failed = []  # (first sheet row, rows) of chunks that ran out of retries
+        self.lock = threading.Lock()
+        self.pending = []
+        self.rows = 0  # Data rows handed to the writers
+        self.grid_rows = worksheet.row_count
+
+        spreadsheet.batch_update({'requests': [
+            clear_request(worksheet.id),
+            grid_size_request(worksheet.id, columns=len(SHEET_HEADERS)),
+            update_cells_request(worksheet.id, 0, [SHEET_HEADERS]),
+            header_format_request(worksheet.id)
+        ]})
+
+    def write(self, contracts):
+        self.pending.extend(sheet_row(c) for c in contracts)
+        while len(self.pending) >= self.chunk_rows:
+            self.submit(self.pending[:self.chunk_rows])
+            self.pending = self.pending[self.chunk_rows:]
+
+    def submit(self, rows):
+        first_row = 2 + self.rows
+        self.rows += len(rows)
+
+        # Values writes can't go past the grid: grow it (enough for the next few chunks too)
+        if 1 + self.rows > self.grid_rows:
+            self.grid_rows = 1 + self.rows + self.chunk_rows * self.writers
+            self.spreadsheet.batch_update({'requests': [grid_size_request(self.worksheet.id, rows=self.grid_rows)]})
+
+        # Bounded: wait for a writer before buffering another chunk
+        if len(self.inflight) >= self.writers:
+            _, self.inflight = wait(self.inflight, return_when=FIRST_COMPLETED)
+        self.inflight.add(self.pool.submit(self.write_chunk, first_row, rows))
+
+    def write_chunk(self, first_row, rows):
+        cells = a1_range(self.worksheet.title, first_row, first_row + len(rows) - 1)
+        for attempt in range(self.retries + 1):
+            try:
+                self.spreadsheet.values_update(cells, params={'valueInputOption': 'RAW'}, body={'values': rows})
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    print(f"✗ Chunk {cells} failed: {e}")
+                    with self.lock:
+                        self.failed.append((first_row, rows))
+                    return
+                print(f"⚠️  Chunk {cells} failed ({e}), retrying ({attempt + 1}/{self.retries})")
+                time.sleep(2 ** attempt)
+
+    def close(self):
+        if self.pending:
+            self.submit(self.pending)
+            self.pending = []
+        wait(self.inflight)
+        self.pool.shutdown()
+
+        if self.failed:
+            quota.print_stats()
+            ranges = ', '.join(f"{first}-{first + len(rows) - 1}" for first, rows in sorted(self.failed))
+            raise RuntimeError(f"{len(self.failed)} chunks could not be written (sheet rows {ranges})")
+
+        if self.grid_rows != 1 + self.rows:
+            self.spreadsheet.batch_update({'requests': [grid_size_request(self.worksheet.id, rows=1 + self.rows)]})
+        print(f"✓ Uploaded {self.rows} rows to Google Sheets in chunks of {self.chunk_rows}: {self.spreadsheet.url}")
+        quota.print_stats()
+
+    def abort(self):
+        self.pending = []
+        self.pool.shutdown(cancel_futures=True)
+        print(f"⚠️  Google Sheets upload stopped after {self.rows} rows")
+        quota.print_stats()
+
+
+def drive_version(spreadsheet):
+    """Drive revision counter of the spreadsheet file - bumped by every edit"""
+    client = spreadsheet.client
+    http = getattr(client, 'http_client', client)  # gspread 6 moved request() to http_client
+    response = http.request(
+        'get', f"https://www.googleapis.com/drive/v3/files/{spreadsheet.id}",
+        params={'fields': 'version', 'supportsAllDrives': True}
+    )
+    return response.json().get('version')
+
+
+class SheetManifest:
+    """What the worksheet held after our last successful sync
+
+    Lets the next delta be computed without reading the sheet back. It's only
+    trusted while a cheap probe agrees: same spreadsheet/worksheet, same grid
+    row count and an unchanged Drive file version (any edit, by hand or
+    otherwise, bumps it).
+    """
+
+    def __init__(self, data=None):
+        self.data = data or {}
+
+    @classmethod
+    def load(cls, path=SHEETS_MANIFEST_FILE):
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(json.load(f))
+        except ValueError:
+            return cls()
+
+    def save(self, path=SHEETS_MANIFEST_FILE):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f)
+
+    def matches(self, spreadsheet, worksheet):
+        """Probe the remote sheet; True if it is still exactly as recorded"""
+        data = self.data
+        if not data or (data.get('spreadsheet_id'), data.get('worksheet_id')) != (spreadsheet.id, worksheet.id):
+            return False
+        if data.get('grid_rows') != worksheet.row_count:
+            print(f"Sheet manifest: grid has {worksheet.row_count} rows, expected {data.get('grid_rows')}")
+            return False
+        try:
+            version = drive_version(spreadsheet)
+        except Exception as e:
+            print(f"Sheet manifest: version probe failed ({e})")
+            return False
+        if version != data.get('version'):
+            print("Sheet manifest: sheet was edited since the last sync")
+            return False
+        return True
+
+    def rows(self):
+        """(ids in sheet order, id -> hash)"""
+        rows = self.data.get('rows', {})
+        ids = sorted(rows, key=lambda key: rows[key][0])
+        return ids, {key: rows[key][1] for key in ids}
+
+    @classmethod
+    def record(cls, spreadsheet, worksheet, grid_rows, ids, hashes):
+        return cls({
+            'spreadsheet_id': spreadsheet.id,
+            'worksheet_id': worksheet.id,
+            'version': drive_version(spreadsheet),
+            'grid_rows': grid_rows,
+            'row_count': len(ids),
+            'rows': {key: [n + 2, hashes[key]] for n, key in enumerate(ids)}  # Sheet row numbers
+        })
+
+
+class DeltaSheetsSink:
+    """Syncs the worksheet to a stream of contract pages, sending only the changes
+
+    The id -> row map with a content hash per row comes from the manifest
+    of the last sync when the probe confirms it, otherwise from reading the
+    sheet once. While contracts stream in, only rows that are new or whose
+    hash differs are kept. On close one batch_update deletes rows whose id
+    is gone, inserts the new rows and writes the cells of new and changed
+    rows. Existing rows keep their place; a new contract goes in right after
+    the contract that preceded it in the stream. Nothing is written if
+    the run is aborted.
+    """
+
+    def __init__(self, spreadsheet, worksheet, manifest_file=SHEETS_MANIFEST_FILE):
+        self.spreadsheet = spreadsheet
+        self.worksheet = worksheet
+        self.manifest_file = manifest_file
+        self.order = []  # Ids in stream order
+        self.pending = {}  # id -> row, new or changed only
+
+        manifest = SheetManifest.load(manifest_file)
+        if manifest.matches(spreadsheet, worksheet):
+            print(f"Sheet manifest: {manifest.data['row_count']} rows, no sheet read needed")
+            self.header_ok = True
+            self.stale_rows = 0
+            self.sheet_ids, self.sheet_hashes = manifest.rows()
+        else:
+            self.read_sheet()
+
+    def read_sheet(self):
+        """Full reconciliation: rebuild the id -> hash map from the sheet itself"""
+        print("Reading worksheet to reconcile...")
+        width = len(SHEET_HEADERS)
+        values = self.worksheet.get_all_values()
+        self.header_ok = bool(values) and values[0][:width] == SHEET_HEADERS
+        self.stale_rows = 0 if self.header_ok else max(len(values) - 1, 0)
+        self.sheet_ids = []  # Ids in sheet order (row n + 2)
+        self.sheet_hashes = {}
+        for row in values[1:] if self.header_ok else []:
+            row = (row + [''] * width)[:width]
+            self.sheet_ids.append(row[0])
+            self.sheet_hashes[row[0]] = row_hash(row)
+
+    def write(self, contracts):
+        for c in contracts:
+            key = str(c.id)
+            if key in self.pending:
+                continue
+            row = sheet_row(c)
+            self.order.append(key)
+            if self.sheet_hashes.get(key) != row_hash(row):
+                self.pending[key] = row
+
+    def plan(self):
+        """Final row layout (ids) and the row ranges to delete, as 0-based data indexes"""
+        keep = set(self.order)
+        deleted = [i for i, key in enumerate(self.sheet_ids) if key not in keep]
+        remaining = [key for key in self.sheet_ids if key in keep]
+        existing = set(remaining)
+
+        # New ids go after the existing id that preceded them in the stream
+        top, after, anchor = [], {}, None
+        for key in self.order:
+            if key in existing:
+                anchor = key
+            elif anchor is None:
+                top.append(key)
+            else:
+                after.setdefault(anchor, []).append(key)
+
+        layout = top
+        for key in remaining:
+            layout.append(key)
+            layout.extend(after.get(key, ()))
+        return layout, existing, _runs(deleted)
+
+    def requests(self):
+        """batchUpdate requests for the sync (empty when nothing changed)"""
+        sheet_id = self.worksheet.id
+        layout, existing, deleted = self.plan()
+        requests = []
+
+        def rows_range(start, end):
+            return {'sheetId': sheet_id, 'dimension': 'ROWS', 'startIndex': start, 'endIndex': end}
+
+        # Deletions bottom-up so earlier indexes stay valid
+        if self.stale_rows:
+            requests.append({'deleteDimension': {'range': rows_range(1, 1 + self.stale_rows)}})
+        for start, end in reversed(deleted):
+            requests.append({'deleteDimension': {'range': rows_range(1 + start, 1 + end)}})
+
+        # Insertions top-down at their final positions (appended once past the grid's end)
+        grid_rows = self.worksheet.row_count - self.stale_rows - (len(self.sheet_ids) - len(existing))
+        new_rows = [i for i, key in enumerate(layout) if key not in existing]
+        for start, end in _runs(new_rows):
+            if 1 + start < grid_rows:
+                requests.append({'insertDimension': {'range': rows_range(1 + start, 1 + end),
+                                                     'inheritFromBefore': False}})
+            else:
+                requests.append({'appendDimension': {'sheetId': sheet_id, 'dimension': 'ROWS',
+                                                     'length': end - start}})
+            grid_rows += end - start
+        self.layout = layout
+        self.grid_rows = grid_rows
+
+        if not self.header_ok:
+            requests.append(update_cells_request(sheet_id, 0, [SHEET_HEADERS]))
+            requests.append(header_format_request(sheet_id))
+
+        written = [i for i, key in enumerate(layout) if key in self.pending]
+        for start, end in _runs(written):
+            rows = [self.pending[layout[i]] for i in range(start, end)]
+            requests.append(update_cells_request(sheet_id, 1 + start, rows))
+
+        self.stats = {
+            'new': len(new_rows),
+            'changed': len(written) - len(new_rows),
+            'deleted': len(self.sheet_ids) - len(existing) + self.stale_rows,
+            'cells': len(written) * len(SHEET_HEADERS)
+        }
+        return requests
+
+    def close(self):
+        requests = self.requests()
+        if requests:
+            self.spreadsheet.batch_update({'requests': requests})
+
+        hashes = {key: row_hash(self.pending[key]) if key in self.pending else self.sheet_hashes[key]
+                  for key in self.layout}
+        try:
+            SheetManifest.record(self.spreadsheet, self.worksheet, self.grid_rows,
+                                 self.layout, hashes).save(self.manifest_file)
+        except Exception as e:
+            print(f"⚠️  Could not save sheet manifest: {e}")
+        print(f"✓ Synced Google Sheets ({self.stats['new']} new, {self.stats['changed']} changed, "
+              f"{self.stats['deleted']} deleted, {self.stats['cells']} cells sent): {self.spreadsheet.url}")
+        quota.print_stats()
+
+    def abort(self):
+        print("⚠️  Google Sheets sync skipped - scrape did not finish")
+        quota.print_stats()
+
+
+def _runs(indexes):
+    """Sorted indexes grouped into contiguous [start, end) ranges"""
+    runs = []
+    for i in indexes:
+        if runs and runs[-1][1] == i:
+            runs[-1][1] = i + 1
+        else:
+            runs.append([i, i + 1])
+    return runs
+
+
+def open_sink(spreadsheet_name, worksheet_name, credentials_json='', credentials_file=''):
+    """Sink for the worksheet (delta, chunked or full per SHEETS_SYNC), or None if it can't be opened"""
+    try:
+        opened = open_worksheet(spreadsheet_name, worksheet_name, credentials_json, credentials_file)
+        if not opened:
+            return None
+        if SHEETS_SYNC == 'delta':
+            return DeltaSheetsSink(*opened)
+        return ChunkedSheetsSink(*opened) if SHEETS_SYNC == 'chunked' else SheetsSink(*opened)
+    except Exception as e:
+        print(f"✗ Google Sheets upload failed: {e}")
+        return None
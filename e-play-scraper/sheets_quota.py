@@ -0,0 +1,116 @@
+"""
+Quota-aware request layer for the Google Sheets API
+Every HTTP call gspread makes goes through one place: token buckets keep us
+under the per-minute read/write quotas, 429s and 5xx are retried with
+backoff, and each upload's call count and bytes are reported
+"""
+import os
+import random
+import threading
+import time
+
+SHEETS_WRITES_PER_MINUTE = float(os.getenv('SHEETS_WRITES_PER_MINUTE', '60'))  # Google's per-user default
+SHEETS_READS_PER_MINUTE = float(os.getenv('SHEETS_READS_PER_MINUTE', '60'))
+SHEETS_MAX_RETRIES = int(os.getenv('SHEETS_MAX_RETRIES', '5'))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """Blocking token bucket: up to capacity calls at once, refilled at rate per second"""
+
+    def __init__(self, per_minute):
+        self.capacity = max(per_minute, 1)
+        self.rate = per_minute / 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        """Wait for a token; returns the seconds spent waiting"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def drain(self):
+        """The server says we're over quota - don't burst again until refilled"""
+        with self.lock:
+            self.tokens = min(self.tokens, 0)
+
+
+class SheetsQuota:
+    """Throttles, retries and counts the requests of a gspread client"""
+
+    def __init__(self, writes_per_minute=SHEETS_WRITES_PER_MINUTE, reads_per_minute=SHEETS_READS_PER_MINUTE,
+                 max_retries=SHEETS_MAX_RETRIES):
+        self.writes = TokenBucket(writes_per_minute)
+        self.reads = TokenBucket(reads_per_minute)
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = {'reads': 0, 'writes': 0, 'retries': 0}
+            self.bytes_sent = 0
+            self.bytes_received = 0
+            self.throttled = 0.0
+
+    def install(self, client):
+        """Route every request of a gspread client (and its spreadsheets) through this layer"""
+        session = getattr(client, 'http_client', client).session  # gspread 6 / gspread 5
+        if getattr(session, 'sheets_quota', None) is self:
+            return client
+        send = session.request
+        session.request = lambda method, url, *args, **kwargs: self.request(send, method, url, *args, **kwargs)
+        session.sheets_quota = self
+        return client
+
+    def request(self, send, method, url, *args, **kwargs):
+        kind = 'reads' if method.upper() == 'GET' else 'writes'
+        bucket = getattr(self, kind)
+        for attempt in range(self.max_retries + 1):
+            waited = bucket.take()
+            response = send(method, url, *args, **kwargs)
+            with self.lock:
+                self.counts[kind] += 1
+                self.bytes_sent += len(response.request.body or b'') if response.request else 0
+                self.bytes_received += len(response.content)
+                self.throttled += waited
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+
+            if response.status_code == 429:
+                bucket.drain()
+            retry_after = response.headers.get('retry-after', '')
+            wait = float(retry_after) if retry_after.isdigit() else min(2 ** attempt, 32) + random.uniform(0, 1)
+            print(f"Sheets API {response.status_code} - retrying in {wait:.1f}s "
+                  f"(attempt {attempt + 1}/{self.max_retries})")
+            with self.lock:
+                self.counts['retries'] += 1
+            time.sleep(wait)
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts, bytes_sent=self.bytes_sent, bytes_received=self.bytes_received,
+                        throttled=self.throttled)
+
+    def print_stats(self, reset=True):
+        """Print this upload's API usage (and start counting afresh)"""
+        s = self.stats()
+        print(f"Sheets API: {s['reads'] + s['writes']} calls ({s['reads']} read, {s['writes']} write), "
+              f"{s['bytes_sent'] / 1024:.1f} KB sent, {s['bytes_received'] / 1024:.1f} KB received, "
+              f"{s['retries']} retries, {s['throttled']:.1f}s throttled")
+        if reset:
+            self.reset()
+
+
+# One layer per process: quota is per user, whichever client makes the call
+quota = SheetsQuota()
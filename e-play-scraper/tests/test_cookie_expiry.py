@@ -0,0 +1,64 @@
+"""
+Cookies that expire part-way through a scrape: the auto-cookie scraper must
+refresh them once and send the new ones with every later page
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import cloud_scraper_auto_cookies as scraper
+import page_fetcher
+from credential_cache import CredentialCache
+from http_session import ScraperSession
+from mock_server import MockContractsServer, SyntheticCorpus
+from pipeline import iter_contracts, stream_contracts
+from retry_policy import RetryPolicy
+
+PAGES = 30
+EXPIRE_AFTER_PAGE = 3
+
+
+class ExpiringServer(MockContractsServer):
+    """Accepts only the current cf_clearance, which changes once EXPIRE_AFTER_PAGE was served"""
+
+    def handle(self, payload):
+        result = super().handle(payload)
+        if int(payload.get('paged') or 1) == EXPIRE_AFTER_PAGE and int(payload.get('quantity') or 120) == 120:
+            self.clearance = 'renewed'
+        return result
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Checkpoint and cookie cache files
+    server = ExpiringServer(corpus=SyntheticCorpus(PAGES * 120), port=0, clearance='initial')
+    monkeypatch.setattr(scraper, 'API_URL', server.start())
+    monkeypatch.setattr(scraper, 'credentials', CredentialCache(path=str(tmp_path / 'cookie_cache.json')))
+    monkeypatch.setattr(scraper, 'session', ScraperSession(headers=scraper.HEADERS))
+    monkeypatch.setattr(scraper, 'policy', RetryPolicy(limiter=page_fetcher.limiter, scale=0))
+    monkeypatch.setattr(page_fetcher.limiter, 'rate', 0)
+    monkeypatch.setenv('CF_CLEARANCE', 'initial')
+    yield server
+    server.stop()
+
+
+def test_scrape_completes_when_cookies_expire_mid_run(server, monkeypatch):
+    refreshes = []
+
+    def refresh_cookies_automated():
+        refreshes.append(server.clearance)
+        return {'cf_clearance': server.clearance, '_ga': '', '_ga_ZH4G2KK1JY': ''}
+
+    monkeypatch.setattr(scraper, 'refresh_cookies_automated', refresh_cookies_automated)
+
+    contracts = list(iter_contracts(stream_contracts(scraper.fetch_contracts_page)))
+
+    assert len({c.id for c in contracts}) == PAGES * 120
+    assert refreshes == ['renewed']
+    assert scraper.session.cookies['cf_clearance'] == 'renewed'
+    # Only requests already in flight when the cookies expired are rejected
+    assert server.status_counts.get(403, 0) <= page_fetcher.MAX_CONCURRENT_PAGES
+    assert scraper.policy.breaker.trips == 0
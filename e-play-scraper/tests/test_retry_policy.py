@@ -0,0 +1,43 @@
+"""
+Failure classes of real transport errors: they must get the network retry
+schedule, not the no-retry client one
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from http_session import ScraperSession
+from retry_policy import RetryPolicy, classify
+
+
+def connection_error():
+    """The error curl_cffi raises for a refused connection (it carries a status 0 response)"""
+    session = ScraperSession()
+    try:
+        with pytest.raises(Exception) as info:
+            session.post('http://127.0.0.1:1/', timeout=5)
+    finally:
+        session.close()
+    return info.value
+
+
+def test_curl_connection_error_is_network():
+    error = connection_error()
+    assert getattr(error.response, 'status_code', None) == 0
+    assert classify(error) == 'network'
+
+
+def test_connection_errors_are_retried():
+    policy = RetryPolicy(scale=0)
+    attempts = []
+
+    def attempt():
+        attempts.append(1)
+        raise connection_error()
+
+    with pytest.raises(Exception):
+        policy.call(attempt)
+    assert len(attempts) == policy.schedules['network'].retries + 1
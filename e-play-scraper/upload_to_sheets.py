@@ -7,6 +7,9 @@ import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import os
 
+from sheets import append_cells_request, auto_resize_request, clear_request, header_format_request
+from sheets_quota import quota
+
 # Configuration
 SCOPE = [
     'https://spreadsheets.google.com/feeds',
@@ -38,7 +41,7 @@ def authenticate():
         return None
     
     creds = ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_FILE, SCOPE)
-    client = gspread.authorize(creds)
+    client = quota.install(gspread.authorize(creds))
     return client
 
 
@@ -99,22 +102,18 @@ def upload_contracts():
         ]
         rows.append(row)
     
-    # Clear existing data and write new
+    # Clear, write, format header row (A1:N1) and auto-resize columns in one request
     print(f"\nUploading {len(contracts)} contracts to Google Sheets...")
-    worksheet.clear()
-    worksheet.update('A1', rows)
-    
-    # Format header row
-    worksheet.format('A1:N1', {
-        'textFormat': {'bold': True},
-        'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9}
-    })
-    
-    # Auto-resize columns
-    worksheet.columns_auto_resize(0, len(headers))
+    spreadsheet.batch_update({'requests': [
+        clear_request(worksheet.id),
+        append_cells_request(worksheet.id, rows),
+        header_format_request(worksheet.id, 14),
+        auto_resize_request(worksheet.id, len(headers))
+    ]})
     
     print(f"\nDone! Sheet URL: {spreadsheet.url}")
     print(f"Total rows: {len(rows)}")
+    quota.print_stats()
 
 
 if __name__ == '__main__':
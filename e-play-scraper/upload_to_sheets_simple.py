@@ -7,6 +7,9 @@ import gspread
 from google.oauth2.service_account import Credentials
 import os
 
+from sheets import append_cells_request, clear_request, header_format_request
+from sheets_quota import quota
+
 # Configuration
 SCOPE = [
     'https://www.googleapis.com/auth/spreadsheets',
@@ -35,7 +38,7 @@ def upload_contracts():
     
     print("Authenticating...")
     creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPE)
-    client = gspread.authorize(creds)
+    client = quota.install(gspread.authorize(creds))
     
     # Open or create spreadsheet
     try:
@@ -76,18 +79,16 @@ def upload_contracts():
             'Yes' if c.get('flags', {}).get('rebranding') else ''
         ])
     
-    # Upload
+    # Upload (clear, rows and header format in one request)
     print(f"Uploading {len(contracts)} rows...")
-    worksheet.clear()
-    worksheet.update('A1', rows, value_input_option='RAW')
-    
-    # Format header
-    worksheet.format('A1:M1', {
-        'textFormat': {'bold': True},
-        'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9}
-    })
+    spreadsheet.batch_update({'requests': [
+        clear_request(worksheet.id),
+        append_cells_request(worksheet.id, rows),
+        header_format_request(worksheet.id)
+    ]})
     
     print(f"\nDone! Sheet: {spreadsheet.url}")
+    quota.print_stats()
 
 
 def print_setup_instructions():
@@ -0,0 +1,161 @@
+"""
+Watch mode: near-real-time polling for new contracts
+Polls a small page 1 on an adaptive interval and runs an incremental sync
+(store, exports, Sheets delta) as soon as an unseen id shows up
+"""
+import os
+import random
+import statistics
+import time
+from collections import deque
+from datetime import datetime
+
+from retry_policy import BREAKER_COOLDOWN, CircuitOpen
+
+WATCH_QUANTITY = int(os.getenv('WATCH_QUANTITY', '10'))  # Items per poll
+WATCH_MIN_INTERVAL = float(os.getenv('WATCH_MIN_INTERVAL', '15'))  # Seconds, floor
+WATCH_MAX_INTERVAL = float(os.getenv('WATCH_MAX_INTERVAL', '600'))  # Seconds, ceiling
+WATCH_BACKOFF = float(os.getenv('WATCH_BACKOFF', '1.5'))  # Interval growth per quiet poll
+LATENCY_SAMPLES = 1000  # Most recent contracts the latency figures cover
+
+
+class AdaptiveInterval:
+    """Poll interval that halves when new ids appear and grows while it's quiet"""
+
+    def __init__(self, floor=WATCH_MIN_INTERVAL, ceiling=WATCH_MAX_INTERVAL, backoff=WATCH_BACKOFF):
+        self.floor = floor
+        self.ceiling = max(ceiling, floor)
+        self.backoff = backoff
+        self.value = floor
+
+    def active(self):
+        self.value = max(self.floor, self.value / 2)
+
+    def quiet(self):
+        self.value = min(self.ceiling, self.value * self.backoff)
+
+    def pause(self, seconds):
+        """Wait at least seconds (up to the ceiling), e.g. while the circuit breaker is open"""
+        self.value = min(self.ceiling, max(self.value, seconds * 1.1))  # 1.1: clear of the jitter
+
+    def next_wait(self):
+        """Seconds until the next poll, with a little jitter"""
+        return min(self.ceiling, max(self.floor, self.value * random.uniform(0.9, 1.1)))
+
+
+class LatencyStats:
+    """Median / p95 of the latest per-contract latencies, in seconds"""
+
+    def __init__(self, size=LATENCY_SAMPLES):
+        self.samples = deque(maxlen=size)
+
+    def add(self, seconds, count=1):
+        self.samples.extend([seconds] * count)
+
+    def summary(self):
+        if not self.samples:
+            return "no samples yet"
+        median = statistics.median(self.samples)
+        p95 = statistics.quantiles(self.samples, n=20)[-1] if len(self.samples) > 1 else self.samples[0]
+        return f"median {median:.1f}s, p95 {p95:.1f}s over {len(self.samples)} contracts"
+
+
+def published_at(date):
+    """Epoch seconds of a contract date that carries a time of day, else None
+
+    A bare day says nothing useful about when the contract went up. Dates
+    without a UTC offset are read as local time.
+    """
+    date = str(date or '')
+    if len(date) <= 10:
+        return None
+    try:
+        return datetime.fromisoformat(date).timestamp()
+    except ValueError:
+        return None
+
+
+def watch(poll, sync, known):
+    """Poll until interrupted, syncing whenever page 1 holds an unseen id
+
+    poll() returns (id, date) pairs for page 1 (newest first) or None if the
+    request failed; sync() runs the incremental sync and returns a truthy
+    value only if it completed; known is the set of ids already stored. A
+    poll or sync that raises counts as failed, and CircuitOpen waits out the
+    breaker's cooldown, so the watcher keeps going through an outage.
+
+    Detection latency is an upper bound: a contract first seen by a poll
+    went up after the previous successful poll, or at its date when that
+    carries a time and is later. Contracts seen by the first poll have no
+    previous poll, so they only count if dated to the second. Sync time runs
+    from the poll that spotted a contract to the end of the sync that
+    pushed it through.
+    """
+    interval = AdaptiveInterval()
+    detection = LatencyStats()
+    sync_time = LatencyStats()
+    spotted = {}  # Unsynced new id -> (poll that first saw it, detection bound or None)
+    last_ok_poll = None
+
+    print(f"Watching for new contracts every {interval.floor:g}-{interval.ceiling:g}s "
+          f"({WATCH_QUANTITY} items per poll)")
+    try:
+        while True:
+            polled_at = time.time()
+            error = None
+            try:
+                newest = poll()
+            except Exception as e:
+                newest, error = None, e
+            new = [key for key, _ in newest or [] if key not in known]
+
+            for key, date in newest or []:
+                if key in known or key in spotted:
+                    continue
+                bounds = [polled_at - last_ok_poll] if last_ok_poll is not None else []
+                published = published_at(date)
+                if published is not None and published <= polled_at:
+                    bounds.append(polled_at - published)
+                spotted[key] = (polled_at, min(bounds) if bounds else None)
+            if newest is not None:
+                last_ok_poll = polled_at
+
+            if newest is None:
+                print(f"⚠️  Poll failed{f': {error}' if error else ''}")
+                if isinstance(error, CircuitOpen):
+                    interval.pause(BREAKER_COOLDOWN)
+                else:
+                    interval.quiet()
+            elif not new:
+                interval.quiet()
+            else:
+                print(f"\n{len(new)} new contract(s) on page 1 - syncing...")
+                try:
+                    synced = sync()
+                except Exception as e:
+                    print(f"✗ Sync failed: {e}")
+                    synced, error = False, e
+
+                if synced:
+                    synced_at = time.time()
+                    for key in new:
+                        seen_at, bound = spotted.pop(key)
+                        if bound is not None:
+                            detection.add(bound)
+                        sync_time.add(synced_at - seen_at)
+                    known.update(new)
+                    print(f"Detection latency (upper bound): {detection.summary()}")
+                    print(f"Sync time: {sync_time.summary()}")
+                    interval.active()
+                elif isinstance(error, CircuitOpen):
+                    interval.pause(BREAKER_COOLDOWN)
+                else:
+                    interval.quiet()  # Try again later rather than hammering a failing sync
+
+            wait = interval.next_wait()
+            print(f"[{time.strftime('%H:%M:%S')}] next poll in {wait:.0f}s")
+            time.sleep(wait)
+    except KeyboardInterrupt:
+        print("\nWatch stopped")
+        print(f"Detection latency (upper bound): {detection.summary()}")
+        print(f"Sync time: {sync_time.summary()}")